@@ -27,9 +27,12 @@ def parse_args() -> tuple[argparse.Namespace, list[str]]:
     parser.add_argument('--load-scripts', nargs='*', default=[],
                         help='Load script files (in controlpanel/scripts), all by default. '
                              'Alternatively, supply the filenames of the script files (or presets) to load.'
-                             'A preset is a .txt file containing newline-separated script file names')
+                             'A preset is a .txt file containing newline-separated script file names. '
+                             'Prefix a script with "worker:" to run it in a process of its own')
     parser.add_argument('--cheats', '-c', action='store_true', default=False,
                         help='Enable cheat-protected console commands (disabled by default)')
+    parser.add_argument('--threaded-artnet', action='store_true', default=False,
+                        help='Receive ArtNet packets on a separate thread instead of the event loop')
     return parser.parse_known_args()
 
 
@@ -39,7 +42,7 @@ def main():
     artnet = ArtNet()  # This is where we initialise our one and ONLY ArtNet instance for the entire program.
     api.Services.artnet = artnet
 
-    event_manager = api.EventManager(artnet)
+    event_manager = api.EventManager(artnet, threaded_receive=args.threaded_artnet)
     api.Services.event_manager = event_manager
     # needs to be called after Services.event_manager has been set
     event_manager.instantiate_devices([api.dummy,])
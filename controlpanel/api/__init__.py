@@ -5,14 +5,22 @@ from .commons import (
     EventSourceType,
     EventActionType,
     EventValueType,
+    ValueRange,
+    ValuePredicate,
     Condition,
     CallbackType,
     Subscriber,
+    ConcurrencyPolicy,
     )
+from .event_queue import QueuePolicy, EventLane
+from .subscriptions import Subscription
+from .periodic import PeriodicTask, OverrunPolicy
+from .reactive import Cell, Derived
+from .event_patterns import EventPattern, CompiledPattern, on, sequence, all_of, count, debounce, throttle
 from typing import Literal, TYPE_CHECKING, Callable, TypeVar
 from .services import Services
 from .load_scripts import load_scripts
-from .api import call_with_frequency, fire_event, subscribe, send_dmx
+from .api import call_with_frequency, when, cell, derived, wait_for, sleep, fire_event, emitter, Emitter, subscribe, send_dmx
 from .callback import callback
 from .get_device import get_device
 from .event_manager import EventManager
@@ -23,7 +31,6 @@ if TYPE_CHECKING:
     from controlpanel.dmx import DMXUniverse
     from types import ModuleType
     artnet: ArtNet
-    event_manager: EventManager
     game_manager: GameManager
     dmx: DMXUniverse
     loaded_scripts: dict[str, ModuleType]
@@ -32,11 +39,11 @@ if TYPE_CHECKING:
     get_game: Callable[[str | None], BaseGame | None]
 
 
-def __getattr__(name: Literal["artnet", "event_manager", "game_manager", "dmx"]):
+# api.event_manager is the controlpanel.api.event_manager submodule, which importing it binds as an attribute of the
+# package before this is ever consulted. The instance is Services.event_manager.
+def __getattr__(name: Literal["artnet", "game_manager", "dmx"]):
     if name == "artnet":
         return Services.artnet
-    elif name == "event_manager":
-        return Services.event_manager
     elif name == "game_manager":
         return Services.game_manager
     elif name == "dmx":
@@ -1,26 +1,76 @@
-import time
-import threading
-from typing import TypeVar
+import re
+import sys
+from typing import Any, Callable, TypeVar
 from controlpanel.shared.base import Device
 from controlpanel.api.dummy import Fixture
 from .services import Services
-from .commons import EventSourceType, EventActionType, EventValueType, CallbackType
+from .commons import (Event, EventSourceType, EventActionType, EventValueType, CallbackType, ValuePredicate,
+                      ConcurrencyPolicy, Subscriber)
+from .event_queue import QueuePolicy, EventLane
+from .subscriptions import Subscription
+from .periodic import PeriodicTask, OverrunPolicy
+from .event_patterns import EventPattern, PATTERN_MATCHED
+from .reactive import Cell, Derived
+from .logger import log
 import inspect
-from types import ModuleType, FrameType
+from types import CodeType, ModuleType, FrameType
 
 
 T = TypeVar("T", bound="BaseGame")
 
+_caller_names: dict[CodeType, str] = {}  # the implicit event source of every function that fired an event
+
 
 def _get_caller_name_and_module() -> str:
-    frame = inspect.currentframe()
-    caller_frame: FrameType = frame.f_back.f_back
+    """The name of the function that called our caller, as "module.function".
+    Looking up the module is slow, so the name is cached by code object. Module level code (e.g. from the developer
+    console) gets a new code object every time and is not cached."""
+    caller_frame: FrameType = sys._getframe(2)
+    code: CodeType = caller_frame.f_code
+    name: str | None = _caller_names.get(code)
+    if name is not None:
+        return name
     module: ModuleType | None = inspect.getmodule(caller_frame)
     module_name: str | None = module.__name__.rsplit(".", maxsplit=1)[-1] if module else None
-    function_name: str = caller_frame.f_code.co_name
+    function_name: str = code.co_name
     if function_name == "<module>":
         function_name = "DeveloperConsole"
-    return module_name + "." + function_name if module_name else function_name
+    name = module_name + "." + function_name if module_name else function_name
+    if code.co_name != "<module>":
+        _caller_names[code] = name
+    return name
+
+
+class Emitter:
+    """Fires events from a fixed source. Created by emitter()."""
+    __slots__ = ("source", "_fire_event")
+
+    def __init__(self, source: EventSourceType, fire: Callable[..., None]) -> None:
+        self.source: EventSourceType = source
+        self._fire_event: Callable[..., None] = fire
+
+    def __repr__(self) -> str:
+        return f"<Emitter {self.source}>"
+
+    def fire(self,
+             action: EventActionType | None = None,
+             value: EventValueType | None = None,
+             *,
+             sender: tuple[str, int] | None = None,
+             ts: float | None = None,
+             lane: EventLane = EventLane.SCRIPT) -> None:
+        self._fire_event(self.source, action, value, sender=sender, ts=ts, lane=lane)
+
+
+def emitter(source: EventSourceType | None = None) -> Emitter:
+    """Returns an Emitter for events from source, which defaults to the calling function like in fire_event.
+    Scripts that fire events often should create one up front: the source is resolved once and fire() goes straight
+    to the EventManager."""
+    if not Services.event_manager:
+        raise RuntimeError("Event manager not initialized")
+    if not source:
+        source = _get_caller_name_and_module()
+    return Emitter(source, Services.event_manager.fire_event)
 
 
 def fire_event(source: EventSourceType | None = None,
@@ -28,58 +78,116 @@ def fire_event(source: EventSourceType | None = None,
                value: EventValueType | None = None,
                *,
                sender: tuple[str, int] | None = None,
-               ts: float | None = None) -> None:
+               ts: float | None = None,
+               lane: EventLane = EventLane.SCRIPT) -> None:
     if not source:
         source = _get_caller_name_and_module()
-    Services.event_manager.fire_event(source, action, value, sender=sender, ts=ts)
+    Services.event_manager.fire_event(source, action, value, sender=sender, ts=ts, lane=lane)
 
 
-def call_with_frequency(frequency: float | int):
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            def run_function():
-                interval = 1 / frequency  # Calculate interval based on frequency
-                setattr(wrapper, "_is_running", True)
-                setattr(wrapper, "stop", lambda: setattr(wrapper, "_is_running", False))
-                while getattr(wrapper, "_is_running"):
-                    func(*args, **kwargs)
-                    time.sleep(interval)  # Wait for the calculated interval
+async def wait_for(source: EventSourceType | re.Pattern | None = None,
+                   action: EventActionType | re.Pattern | None = None,
+                   value: EventValueType | ValuePredicate = None,
+                   *,
+                   timeout: float | None = None) -> Event:
+    """Waits for the next event that matches source, action and value and returns it.
+    Raises TimeoutError if there was none within timeout seconds."""
+    if not Services.event_manager:
+        raise RuntimeError("Event manager not initialized")
+    return await Services.event_manager.wait_for(source, action, value, timeout=timeout)
 
-            thread = threading.Thread(target=run_function, daemon=True)
-            thread.start()
 
-        wrapper()  # Automatically start the function without needing to call it
-        return wrapper
+async def sleep(seconds: float) -> None:
+    """Sleeps without blocking a thread. Sequenced scripts should await this in coroutine callbacks
+    instead of calling time.sleep in synchronous ones."""
+    if not Services.event_manager:
+        raise RuntimeError("Event manager not initialized")
+    await Services.event_manager.sleep(seconds)
+
+
+def call_with_frequency(frequency: float | int,
+                        *,
+                        policy: OverrunPolicy = OverrunPolicy.SKIP,
+                        blocking: bool = True) -> Callable[[Callable[[], Any]], PeriodicTask]:
+    """Calls the decorated function frequency times per second, starting right away.
+    The decorated name refers to a PeriodicTask, which can be stopped, restarted and given a new frequency.
+    Synchronous functions run in the thread pool of their script. Pass blocking=False for short functions that
+    neither sleep nor wait, to run them on the event loop instead."""
+    def decorator(func: Callable[[], Any]) -> PeriodicTask:
+        if not Services.event_manager:
+            raise RuntimeError("Event manager not initialized")
+        return Services.event_manager.call_with_frequency(func, frequency, policy=policy, blocking=blocking)
+
+    return decorator
+
+
+def when(pattern: EventPattern,
+         *,
+         source: EventSourceType | None = None,
+         concurrency: ConcurrencyPolicy | None = None,
+         max_pending: int = Subscriber.DEFAULT_MAX_PENDING) -> Callable[[CallbackType], CallbackType]:
+    """Calls the decorated function whenever the pattern matches, with an event whose value is the tuple of events
+    that made up the match. The event is fired from source (the function's name by default) with the action
+    "PatternMatched", so games and other scripts can react to it as well."""
+    def decorator(func: CallbackType) -> CallbackType:
+        if not Services.event_manager:
+            raise RuntimeError("Event manager not initialized")
+        name = source or f"{func.__module__.rsplit('.')[-1]}.{func.__name__}"
+        subscribe(func, name, PATTERN_MATCHED, None, concurrency=concurrency, max_pending=max_pending)
+        Services.event_manager.add_pattern(pattern, name)
+        return func
 
     return decorator
 
 
 def subscribe(callback: CallbackType,
-              source_name: EventSourceType | None,
-              action: EventActionType | None,
-              condition_value: EventValueType | None,
+              source_name: EventSourceType | re.Pattern | None,
+              action: EventActionType | re.Pattern | None,
+              condition_value: EventValueType | ValuePredicate | None,
               *,
               fire_once=False,
-              allow_parallelism: bool = False
-              ) -> None:
+              allow_parallelism: bool = False,
+              queue_policy: QueuePolicy | None = None,
+              concurrency: ConcurrencyPolicy | None = None,
+              max_pending: int = Subscriber.DEFAULT_MAX_PENDING,
+              ) -> Subscription:
     if not Services.event_manager:
         raise RuntimeError("Event manager not initialized")
-    Services.event_manager.subscribe(callback,
+    return Services.event_manager.subscribe(callback,
                                      source_name,
                                      action,
                                      condition_value,
                                      fire_once=fire_once,
-                                     allow_parallelism=allow_parallelism)
+                                     allow_parallelism=allow_parallelism,
+                                     queue_policy=queue_policy,
+                                     concurrency=concurrency,
+                                     max_pending=max_pending)
+
+
+def cell(device_name: str, property_name: str) -> Cell:
+    """Returns the observable cell of a sensor property, for example cell("ButtonRed", "pressed")."""
+    device: Device | None = Services.event_manager.devices.get(device_name)
+    if device is None:
+        raise ValueError(f"No device named {device_name} exists in the Device Manifest")
+    cells: dict[str, Cell] = getattr(device, "cells", {})
+    if property_name not in cells:
+        raise ValueError(f"{device_name} has no observable property {property_name}, only {', '.join(cells) or 'none'}")
+    return cells[property_name]
+
+
+def derived(func: Callable[..., Any], *inputs: Cell, name: str | None = None) -> Derived:
+    """Returns a value that is computed by func from the values of the inputs, and recomputed only once they change."""
+    return Derived(func, *inputs, name=name)
 
 
 def send_dmx(device_name: str, data: bytes):
     device: Device = Services.event_manager.devices.get(device_name)
     if device is None:
-        print("No device with that name exists in the Device Manifest.")
+        log.warning("dmx", "No device with that name exists in the Device Manifest.")
         return
     if not isinstance(device, Fixture):
-        print("Device {device_name} is not a Fixture and hence does not receive DMX signals.")
+        log.warning("dmx", "Device {} is not a Fixture and hence does not receive DMX signals.", device_name)
         return
     universe = device.universe
-    print(f"Sending DMX Package to {device_name} @ {universe} with data {data}")
+    log.info("dmx", "Sending DMX Package to {} @ {} with data {}", device_name, universe, data)
     Services.artnet.send_dmx(universe, 0, bytearray(data))
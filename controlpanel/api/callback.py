@@ -1,7 +1,9 @@
+import re
 from typing import Hashable, Callable, Union, TypeVar
 from itertools import product
 from .api import subscribe
-from .commons import CallbackType
+from .commons import CallbackType, ValuePredicate, ConcurrencyPolicy, Subscriber
+from .event_queue import QueuePolicy
 
 
 T = TypeVar('T', bound=Hashable)
@@ -9,11 +11,14 @@ F = TypeVar("F", bound=CallbackType)
 
 
 def callback(*,
-    source: str | list[str] | None = None,
-    action: str | list[str] | None = None,
-    value: Hashable | list[Hashable] | None = None,
+    source: str | re.Pattern | list[str | re.Pattern] | None = None,
+    action: str | re.Pattern | list[str | re.Pattern] | None = None,
+    value: Hashable | ValuePredicate | list[Hashable | ValuePredicate] | None = None,
     fire_once: bool = False,
     allow_parallelism: bool = False,
+    queue_policy: QueuePolicy | None = None,
+    concurrency: ConcurrencyPolicy | None = None,
+    max_pending: int = Subscriber.DEFAULT_MAX_PENDING,
     ) -> Callable[[F], F]:
 
     def normalize(x: Union[str, T, list[T], None]) -> list[T] | list[None]:
@@ -31,7 +36,10 @@ def callback(*,
         for s, a, v in product(sources, actions, values):
             subscribe(func, s, a, v,
                       fire_once=fire_once,
-                      allow_parallelism=allow_parallelism)
+                      allow_parallelism=allow_parallelism,
+                      queue_policy=queue_policy,
+                      concurrency=concurrency,
+                      max_pending=max_pending)
         return func
 
     return decorator
@@ -1,9 +1,14 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
+from enum import Enum
+from collections import deque
 from typing import Callable, Optional, Coroutine, Any
 import asyncio
 import pygame as pg
 from collections.abc import Hashable
 from typing import Generic, TypeVar, TypedDict, Required, NotRequired
+from .stats import SubscriberStats
+from .tracing import EventTrace
 
 # Atomic numbers: iron = 26, oxygen = 8
 # Iron(II) oxide (FeO): 32 protons
@@ -20,20 +25,60 @@ EventValueType = Hashable | None
 T = TypeVar("T")
 
 
-@dataclass(frozen=True)
+def intern_key(key: Any) -> Any:
+    """Interns source and action strings, so that every event and subscription shares one copy of each and lookups
+    can compare them by identity. Anything else (None, patterns) is returned as is."""
+    return sys.intern(key) if type(key) is str else key
+
+
+@dataclass(frozen=True, slots=True)
 class Event(Generic[T]):
     source: EventSourceType
     action: EventActionType
     value: T
     sender: tuple[str, int] | None
     timestamp: float
+    trace: Optional[EventTrace] = field(default=None, compare=False, repr=False)  # only set while tracing is enabled
+
+
+class EventTemplate:
+    """The fixed source and action of the events a device fires for one of its actions, interned once up front."""
+    __slots__ = ("source", "action")
+
+    def __init__(self, source: EventSourceType, action: EventActionType) -> None:
+        self.source: EventSourceType = intern_key(source)
+        self.action: EventActionType = intern_key(action)
+
+    def __repr__(self) -> str:
+        return f"<EventTemplate {self.source} -> {self.action}>"
+
+
+@dataclass(frozen=True)
+class ValueRange:
+    """Matches numeric event values between minimum and maximum. A bound of None leaves that side of the range open."""
+    minimum: float | None = None
+    maximum: float | None = None
+    include_minimum: bool = True
+    include_maximum: bool = True
+
+    def __contains__(self, value: Any) -> bool:
+        if self.minimum is not None and (value < self.minimum or value == self.minimum and not self.include_minimum):
+            return False
+        if self.maximum is not None and (value > self.maximum or value == self.maximum and not self.include_maximum):
+            return False
+        return True
+
+
+# A condition value that matches more than one event value:
+# a ValueRange or range matches the numbers within it, a set matches its members and a callable matches if it returns True
+ValuePredicate = ValueRange | range | frozenset | set | Callable[[Any], bool]
 
 
 @dataclass(frozen=True)
 class Condition:
     source: EventSourceType
     action: EventActionType
-    value: EventValueType
+    value: EventValueType | ValuePredicate
 
 
 CallbackType = (Callable[[Event], Coroutine[Any, Any, None]] |
@@ -43,13 +88,33 @@ CallbackType = (Callable[[Event], Coroutine[Any, Any, None]] |
                 )
 
 
-@dataclass
+class ConcurrencyPolicy(Enum):
+    """What happens to an event for a subscriber whose callback is still running."""
+    PARALLEL = "parallel"  # the callback is started again, alongside the running one
+    SKIP = "skip"  # the event is dropped
+    QUEUE = "queue"  # the event waits in a bounded FIFO and is handled once the running callbacks have finished
+    LATEST = "latest"  # the event waits in place of any waiting event, so only the newest one is handled afterwards
+    RESTART = "restart"  # the running callback is cancelled and started again with the event (coroutines only)
+
+
+@dataclass(slots=True)
 class Subscriber:
+    DEFAULT_MAX_PENDING = 16
+
     callback: CallbackType
     fire_once: bool
-    allow_parallelism: bool
+    concurrency: ConcurrencyPolicy
     requires_event_arg: bool
     task: Optional[asyncio.Task] = None
+    condition: Optional[Condition] = None
+    stats: SubscriberStats = field(default_factory=SubscriberStats)
+    active: bool = True  # cleared once the subscriber has been removed
+    pending: deque[Event] = field(default_factory=deque)  # events waiting for the running callback (QUEUE and LATEST)
+    max_pending: int = DEFAULT_MAX_PENDING
+
+    @property
+    def name(self) -> str:
+        return f"{self.callback.__module__.rsplit('.')[-1]}.{self.callback.__name__}"
 
 
 class SPIConfig(TypedDict):
@@ -1,5 +1,6 @@
 from controlpanel.shared.base.banana_plugs import NO_CONNECTION
 from .sensor import Sensor
+from controlpanel.api.commons import Event
 from typing import Iterable
 
 
@@ -20,6 +21,7 @@ class BananaPlugs(Sensor):
         super().__init__(_artnet, _name)
         self._connections: list[int | None] = [None for _ in plug_pins]
         self._real_connections: list[int | None] = [None for _ in plug_pins]
+        self._connections_cell = self._cell("connections", tuple(self._connections))
 
     @property
     def desynced(self):
@@ -27,7 +29,7 @@ class BananaPlugs(Sensor):
 
     @property
     def connections(self) -> tuple[int | None, ...]:
-        return tuple(self._connections)
+        return self._connections_cell.value
 
     def connect(self, plug_idx: int, socket_idx: int | None) -> None:
         if self._connections[plug_idx] == socket_idx:
@@ -44,6 +46,7 @@ class BananaPlugs(Sensor):
             self._fire_event("PlugDisconnected", (plug_idx, old_socket_idx))
 
         self._connections[plug_idx] = socket_idx
+        self._connections_cell.set(tuple(self._connections))
 
         if socket_idx is not None:
             self._fire_event("PlugConnected", (plug_idx, socket_idx))
@@ -55,3 +58,8 @@ class BananaPlugs(Sensor):
         plug_idx, socket_idx = data
         self._real_connections[plug_idx] = socket_idx if socket_idx != NO_CONNECTION else None
         self.connect(plug_idx, socket_idx)
+
+    def mirror_event(self, event: Event) -> None:
+        if event.action == "ConnectionsChanged":  # fired after every change, with all connections
+            self._connections = list(event.value)
+            self._connections_cell.set(tuple(self._connections))
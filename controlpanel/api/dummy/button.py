@@ -1,5 +1,6 @@
 from artnet import ArtNet
 from .sensor import Sensor
+from controlpanel.api.commons import Event
 
 
 class Button(Sensor):
@@ -12,6 +13,7 @@ class Button(Sensor):
         super().__init__(_artnet, _name)
         self._state: bool = False
         self._real_state: bool | None = None
+        self._pressed_cell = self._cell("pressed", False)
 
     def __bool__(self) -> bool:
         return self._state
@@ -20,12 +22,14 @@ class Button(Sensor):
         if self._state:
             return
         self._state = True
+        self._pressed_cell.set(True)
         self._fire_event("ButtonPressed", True)
 
     def release(self) -> None:
         if not self._state:
             return
         self._state = False
+        self._pressed_cell.set(False)
         self._fire_event("ButtonReleased", False)
 
     @property
@@ -51,3 +55,8 @@ class Button(Sensor):
             self.press()
         else:
             self.release()
+
+    def mirror_event(self, event: Event) -> None:
+        if event.action == "ButtonPressed" or event.action == "ButtonReleased":
+            self._state = event.action == "ButtonPressed"
+            self._pressed_cell.set(self._state)
@@ -2,6 +2,7 @@ import asyncio
 from abc import abstractmethod
 from controlpanel.api.dummy.esp32 import ESP32
 from controlpanel.shared.base import BaseFixture
+from controlpanel.api.tracing import current_trace
 
 
 class Fixture(BaseFixture):
@@ -14,6 +15,10 @@ class Fixture(BaseFixture):
     def _send_dmx_packet(self, data: bytes | bytearray) -> None:
         self._increment_seq()
 
+        trace = current_trace.get()
+        if trace is not None:
+            trace.record_output(self.name)
+
         # Cancel any ongoing packet send task
         if self._current_task and not self._current_task.done():
             self._current_task.cancel()
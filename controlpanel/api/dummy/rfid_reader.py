@@ -1,4 +1,5 @@
 from .sensor import Sensor
+from controlpanel.api.commons import Event
 import time
 
 
@@ -40,3 +41,11 @@ class RFIDReader(Sensor):
         new_uid = data if data else None
         self._real_current_uid = data
         self.scan_uid(new_uid, timestamp=timestamp)
+
+    def mirror_event(self, event: Event) -> None:
+        if event.action == "TagScanned":
+            self._current_uid = event.value
+            self._last_update_time = event.timestamp
+        elif event.action == "TagRemoved" and self._current_uid == event.value:
+            self._current_uid = None
+            self._last_update_time = event.timestamp
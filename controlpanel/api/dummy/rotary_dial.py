@@ -1,6 +1,7 @@
 from artnet import ArtNet
 from .sensor import Sensor
 from controlpanel import api
+from controlpanel.api.commons import ConcurrencyPolicy, Event
 from typing import Literal
 import time
 import asyncio
@@ -22,7 +23,9 @@ class RotaryDial(Sensor):
         self._confirmation_time_seconds: float = confirmation_time_seconds
         self._max_digits: int = max_digits
         self._entered_sequence: list[DigitType] = []
-        api.subscribe(self._wait_for_confirmation, self._name, "DigitEntered", None, allow_parallelism=True)
+        # Every digit restarts the wait, so the sequence is confirmed once the dial has been idle long enough
+        api.subscribe(self._wait_for_confirmation, self._name, "DigitEntered", None,
+                      concurrency=ConcurrencyPolicy.RESTART)
 
     @property
     def desynced(self) -> bool:
@@ -46,13 +49,21 @@ class RotaryDial(Sensor):
         digit: DigitType = (data[0]) % 10  # type: ignore
         self.enter_digit(digit)
 
+    def mirror_event(self, event: Event) -> None:
+        if event.action == "DigitEntered":
+            self._last_digit = event.value
+            self._entered_sequence.append(event.value)
+            self._last_digit_time = event.timestamp
+        elif event.action == "SequenceEntered":
+            self._entered_sequence.clear()
+
     def _confirm_sequence(self) -> None:
         self._fire_event("SequenceEntered", tuple(self._entered_sequence))
         self._entered_sequence.clear()
 
     async def _wait_for_confirmation(self):
-        if not self._entered_sequence:
-            return
+        if not self._entered_sequence or self.mirrored:
+            return  # a mirrored dial learns of the confirmation from the SequenceEntered event of the main process
         await asyncio.sleep(self._confirmation_time_seconds)
         if time.time() - self._last_digit_time < self._confirmation_time_seconds:
             return
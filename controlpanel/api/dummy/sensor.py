@@ -1,20 +1,53 @@
 from controlpanel.shared.base import BaseSensor
-from typing import Hashable
+from typing import Any, Hashable
 from abc import abstractmethod
 from controlpanel import api
+from controlpanel.api.commons import Event, EventTemplate, ValuePredicate
+from controlpanel.api.reactive import Cell
+from controlpanel.api.event_queue import QueuePolicy, EventLane
+from controlpanel.api.sequence_window import SequenceWindow
 
 
 class Sensor(BaseSensor):
     EVENT_TYPES: dict[str, Hashable] = dict()
+    QUEUE_POLICIES: dict[str, QueuePolicy] = dict()
+
+    def __init__(self, _artnet, _name: str) -> None:
+        super().__init__(_artnet, _name)
+        self.sequence_window: SequenceWindow = SequenceWindow()
+        self._event_templates: dict[str, EventTemplate] = {action: EventTemplate(_name, action)
+                                                           for action in self.EVENT_TYPES}
+        self.cells: dict[str, Cell] = dict()  # the observable properties of the sensor, by property name
+        self.mirrored: bool = False  # whether this is a copy in a script worker, whose state follows mirror_event
 
     @property
     @abstractmethod
     def desynced(self) -> bool:
         pass
 
+    def _cell(self, property_name: str, value: Any) -> Cell:
+        cell = self.cells[property_name] = Cell(value, name=f"{self._name}.{property_name}")
+        return cell
+
+    async def wait_for(self,
+                       action: str | None = None,
+                       value: Hashable | ValuePredicate = None,
+                       *,
+                       timeout: float | None = None) -> Event:
+        """Waits for the next event of this sensor with the given action and value, see EventManager.wait_for."""
+        return await api.Services.event_manager.wait_for(self._name, action, value, timeout=timeout)
+
     def _fire_event(self, action_name: str, value: Hashable) -> None:
-        api.fire_event(self._name, action_name, value)
+        template = self._event_templates.get(action_name)
+        if template is None:
+            template = self._event_templates[action_name] = EventTemplate(self._name, action_name)
+        api.Services.event_manager.fire_template(template, value, lane=EventLane.HARDWARE)
 
     @abstractmethod
     def parse_trigger_payload(self, payload: bytes, timestamp: float) -> None:
         pass
+
+    def mirror_event(self, event: Event) -> None:
+        """Applies an event this sensor has fired in the main process to its copy in a script worker,
+        without firing the event again."""
+        pass
@@ -5,6 +5,7 @@ from artnet import ArtNet
 from typing import Callable, SupportsIndex
 import random
 from .esp32 import ESP32
+from controlpanel.api.commons import Event
 
 
 class _States:
@@ -51,6 +52,7 @@ class PisoShiftRegister(Sensor):
         super().__init__(_artnet, _name)
         self._states: list[bool] = [False for _ in range(count * 8)]
         self._real_states: list[bool | None] = [None for _ in range(count * 8)]
+        self._states_cell = self._cell("states", tuple(self._states))
 
     @property
     def desynced(self):
@@ -67,12 +69,13 @@ class PisoShiftRegister(Sensor):
 
     @property
     def states(self):
-        return tuple(self._states)
+        return self._states_cell.value
 
     def set_state(self, index: int, value: bool):
         if self._states[index] == value:
             return
         self._states[index] = value
+        self._states_cell.set(tuple(self._states))
         self._fire_event("ButtonsChanged", ((index, value),) )
 
     def toggle_state(self, index: int):
@@ -96,8 +99,15 @@ class PisoShiftRegister(Sensor):
                     self._states[index] = value
                     updates.append((index, value))
         if updates:
+            self._states_cell.set(tuple(self._states))
             self._fire_event("ButtonsChanged", tuple(updates))
 
+    def mirror_event(self, event: Event) -> None:
+        if event.action == "ButtonsChanged":
+            for index, value in event.value:
+                self._states[index] = value
+            self._states_cell.set(tuple(self._states))
+
 
 class SipoShiftRegister(Fixture):
     def __init__(self,
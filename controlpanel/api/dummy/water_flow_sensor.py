@@ -1,6 +1,8 @@
 import struct
 from .sensor import Sensor
 from artnet import ArtNet
+from controlpanel.api.commons import Event
+from controlpanel.api.event_queue import QueuePolicy
 
 
 class WaterFlowSensor(Sensor):
@@ -8,6 +10,9 @@ class WaterFlowSensor(Sensor):
         "WaterFlow": int,
         "WaterFlowPerSecond": float,
     }
+    QUEUE_POLICIES = {
+        "WaterFlowPerSecond": QueuePolicy.LATEST,
+    }
 
     def __init__(
             self,
@@ -39,3 +44,7 @@ class WaterFlowSensor(Sensor):
         self._fire_event("WaterFlow", water_flow)
         self._fire_event("WaterFlowPerSecond", water_flow / (timestamp - self._last_flow_time))
         self._last_flow_time = timestamp
+
+    def mirror_event(self, event: Event) -> None:
+        if event.action == "WaterFlow":
+            self._lifetime_water_flow += event.value
@@ -0,0 +1,52 @@
+from collections import deque
+import pygame as pg
+from .commons import Event, CONTROL_PANEL_EVENT
+from .logger import log
+
+
+class EventBridge:
+    """A bounded single-producer, single-consumer queue that carries events from the EventManager's dispatch loop to
+    the game loop, which drains it once per frame. Unlike the SDL event queue, it does not compete with keyboard and
+    joystick input for room.
+
+    Appending to and popping from a deque are atomic, so neither side takes a lock. When the game loop falls behind,
+    the oldest events are dropped and counted. Events are only queued once the game loop has started draining.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._events: deque[Event] = deque(maxlen=maxsize)
+        self._attached: bool = False
+        self.delivered: int = 0
+        self.dropped: int = 0
+        self._reported_dropped: int = 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    @property
+    def maxsize(self) -> int:
+        return self._events.maxlen
+
+    def put(self, event: Event) -> None:
+        """Called by the producer only."""
+        if not self._attached:
+            return
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1  # the deque evicts the oldest event
+        self._events.append(event)
+
+    def drain(self) -> list[pg.event.Event]:
+        """Called by the consumer only. Returns the queued events as CONTROL_PANEL_EVENTs."""
+        self._attached = True
+        events = self._events
+        pg_events: list[pg.event.Event] = []
+        for _ in range(len(events)):
+            event = events.popleft()
+            pg_events.append(pg.event.Event(CONTROL_PANEL_EVENT, source=event.source, name=event.action,
+                                            value=event.value, sender=event.sender))
+        self.delivered += len(pg_events)
+        if self.dropped > self._reported_dropped:
+            log.warning("events", "[EventBridge] The game loop fell behind, dropped {} events",
+                        self.dropped - self._reported_dropped)
+            self._reported_dropped = self.dropped
+        return pg_events
@@ -1,13 +1,14 @@
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable, TYPE_CHECKING
+import os
 from types import ModuleType
 import time
+import threading
 from threading import Thread
 import asyncio
 import inspect
-from collections import defaultdict
+import re
 from controlpanel.shared.base import Device
 from controlpanel.api.dummy import Sensor, Fixture
-import pygame as pg
 from artnet import ArtNet, OpCode, ART_NET_PORT
 import importlib.resources
 import json
@@ -17,56 +18,93 @@ from anaconsole import console_command
 from controlpanel import api
 from .commons import (
     Event,
+    EventTemplate,
+    intern_key,
     Condition,
     Subscriber,
+    ConcurrencyPolicy,
     CallbackType,
     EventSourceType,
     EventActionType,
     EventValueType,
+    ValuePredicate,
     KEY_CONTROL_PANEL_PROTOCOL,
-    CONTROL_PANEL_EVENT,
     NodeConfig,
 )
+from .subscriptions import SubscriptionIndex, Subscription, compile_pattern
+from .stats import DispatchStats, SubscriberStats, SequenceStats
+from .event_queue import EventQueue, EventLane, QueuePolicy
+from .executors import ScriptExecutors
+from .tracing import Tracer, current_trace
+from .transport import open_artnet_endpoint
+from .node_registry import NodeRegistry
+from .logger import log, LogLevel
+from .event_bridge import EventBridge
+from .timer_wheel import TimerWheel
+from .event_patterns import EventPattern, CompiledPattern, PATTERN_MATCHED
+from .periodic import PeriodicTask, OverrunPolicy
+from controlpanel.upy.artnet.helper import ART_NET_HEADER
+if TYPE_CHECKING:
+    from .workers import ScriptWorker
+
+
+# ArtTrigger packets: header (8 bytes), op code (2), protocol version (2), filler (2), OEM (2), key, sub key, data
+TRIGGER_OP_CODE_OFFSET = 8
+TRIGGER_OP_CODE = OpCode.ArtTrigger.to_bytes(2, "little")
+TRIGGER_KEY_OFFSET = 16
+TRIGGER_SUBKEY_OFFSET = 17
+TRIGGER_DATA_OFFSET = 18
 
 
 class EventManager:
-    POSSIBLE_EVENT_TYPES = [
-        lambda source, name, value: (source, name, value),
-        lambda source, name, value: (source, name, None),
-        lambda source, name, value: (source, None, value),
-        lambda source, name, value: (source, None, None),
-        lambda source, name, value: (None, name, value),
-        lambda source, name, value: (None, name, None),
-        lambda source, name, value: (None, None, value),
-        lambda source, name, value: (None, None, None),
-    ]
     DEVICE_MANIFEST_FILENAME = 'device_manifest.json'
     ARTPOLL_INTERVAL: int = 60
-
-    def __init__(self, artnet: ArtNet):
+    ARTPOLL_REPLY_WINDOW: float = 2.0  # how long a poll waits for replies before counting the nodes that missed it
+    DISCOVERY_REPLY_WINDOWS: tuple[float, ...] = (0.1, 0.2, 0.5, 1.0)  # the burst of polls sent at startup
+    NODE_REGISTRY_PATH: str = os.path.join(os.path.expanduser("~"), ".controlpanel", "nodes.json")
+    EVENT_QUEUE_SIZE: int = 4096  # per EventLane, so up to three times as many events can be queued in total
+    EVENT_BRIDGE_SIZE: int = 1024
+    DEFAULT_SLOW_CALLBACK_THRESHOLD: float = 0.1
+
+    def __init__(self, artnet: ArtNet, *, threaded_receive: bool = False):
+        """Packets are received on the event loop, unless threaded_receive is set,
+        in which case they are received by ArtNet.listen on a thread of its own."""
         self._artnet: ArtNet = artnet
-        self._artnet.subscribe_all(self._receive)
-        Thread(target=artnet.listen, args=(None,), daemon=True).start()
+        self._threaded_receive: bool = threaded_receive
+        if threaded_receive:
+            self._artnet.subscribe_all(self._receive)
+            Thread(target=artnet.listen, args=(None,), daemon=True).start()
 
         self.devices: dict[str, Device] = dict()
         self._sensor_dict: dict[str, Sensor] = dict()
+        self._sensor_index: dict[bytes, Sensor] = dict()  # the sensors by their ASCII-encoded names
         self._fixture_dict: dict[str, Fixture] = dict()
         self._ip: str = self._get_local_ip()
-
-        self._callback_register: dict[Condition, list[Subscriber]] = defaultdict(list)
-        self._event_queue = asyncio.Queue()
+        self._nodes: NodeRegistry = NodeRegistry()
+        self._nodes.load(self.NODE_REGISTRY_PATH)
+
+        self._subscriptions: SubscriptionIndex = SubscriptionIndex()
+        self._waiters: SubscriptionIndex = SubscriptionIndex()  # coroutines waiting for a single event, see wait_for
+        self.dispatch_stats: DispatchStats = DispatchStats()
+        self._executors: ScriptExecutors = ScriptExecutors()
+        self.slow_callback_threshold: float = self.DEFAULT_SLOW_CALLBACK_THRESHOLD
+        self.tracer: Tracer = Tracer()
         self._reply_queue = asyncio.Queue()
+        self._poll_lock = asyncio.Lock()  # polls share the reply queue, so only one may collect replies at a time
         self._ping_queue = asyncio.Queue()
         self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.timers: TimerWheel = TimerWheel(self.loop)
+        self._periodic_tasks: list[PeriodicTask] = list()
+        self._patterns: list[CompiledPattern] = list()
+        self._loop_thread_id: int | None = None
+        self._transport: asyncio.DatagramTransport | None = None
+        self._event_queue: EventQueue = EventQueue(self.loop, self.EVENT_QUEUE_SIZE, QueuePolicy.DROP_OLDEST)
+        self.event_bridge: EventBridge = EventBridge(self.EVENT_BRIDGE_SIZE)  # drained by the game loop
+        self._workers: list["ScriptWorker"] = list()
         Thread(target=self._run_async_loop, args=(), daemon=True).start()
 
         self._artpoll_response_future: asyncio.Future | None = None
-        self._nodes: list[ESP32] = list()
 
-        self.print_incoming_arttrigger_packets: bool = False
-        self.print_incoming_artdmx_packets: bool = False
-        self.print_incoming_artcmd_packets: bool = False
-        self.print_incoming_artpollreply_packets: bool = False
         self._accept_own_broadcast: bool = False
 
     @console_command
@@ -116,60 +154,185 @@ class EventManager:
     def ip(self) -> str:
         return self._ip
 
+    @property
+    def nodes(self) -> NodeRegistry:
+        return self._nodes
+
     def _run_async_loop(self):
+        self._loop_thread_id = threading.get_ident()
+        if not self._threaded_receive:
+            self.loop.create_task(self._open_transport())
         self.loop.create_task(self._dispatch_loop())
         self.loop.create_task(self._poll_loop(self.ARTPOLL_INTERVAL))
         self.loop.run_forever()
 
+    async def _open_transport(self) -> None:
+        try:
+            self._transport, _ = await open_artnet_endpoint(self._receive, ART_NET_PORT, self._receive_sensor_trigger)
+        except OSError as err:
+            print(f"Unable to receive ArtNet packets on the event loop ({err}), falling back to the listen thread.")
+            self._threaded_receive = True
+            self._artnet.subscribe_all(self._receive)
+            Thread(target=self._artnet.listen, args=(None,), daemon=True).start()
+
+    def _call_in_loop(self, func: Callable[..., Any], *args: Any) -> None:
+        """Calls func on the event loop: right away if we are already on it, otherwise thread-safely."""
+        if threading.get_ident() == self._loop_thread_id:
+            func(*args)
+        else:
+            self.loop.call_soon_threadsafe(func, *args)
+
     async def _dispatch_loop(self):
         while True:
-            event = await self._event_queue.get()
-            await self._notify_subscribers(event)
+            batch: list[Event] = await self._event_queue.get_batch()
+            start = time.perf_counter()
+            await self._dispatch_batch(batch)
+            self.dispatch_stats.record(len(batch), time.perf_counter() - start)
+            if len(self._event_queue):
+                await asyncio.sleep(0)  # let packets that arrived meanwhile into the queue before the next batch
+
+    async def _dispatch_batch(self, batch: list[Event]) -> None:
+        """Notifies the subscribers of every event in the batch, resolving identical events only once."""
+        resolved: dict[tuple[EventSourceType, EventActionType, type, EventValueType], tuple[Subscriber, ...]] = dict()
+        for event in batch:
+            if event.trace is not None:
+                self.tracer.record_dispatch(event.trace)
+            self.event_bridge.put(event)
+            for worker in self._workers:
+                worker.put(event)
+            # True, 1 and 1.0 are equal, but ranges and predicates can tell them apart
+            key = (event.source, event.action, type(event.value), event.value)
+            try:
+                subscribers = resolved.get(key)
+                if subscribers is None:
+                    subscribers = resolved[key] = self._subscriptions.resolve(event.source, event.action, event.value)
+            except TypeError:  # unhashable value
+                subscribers = self._subscriptions.resolve(event.source, event.action, event.value)
+            await self._notify_subscribers(event, subscribers)
+            if len(self._waiters):
+                self._wake_waiters(event)
+
+    def _wake_waiters(self, event: Event) -> None:
+        for waiter in self._waiters.resolve(event.source, event.action, event.value):
+            if self._waiters.remove(waiter.condition, waiter):
+                waiter.callback(event)
+
+    async def wait_for(self,
+                       source: EventSourceType | re.Pattern | None = None,
+                       action: EventActionType | re.Pattern | None = None,
+                       value: EventValueType | ValuePredicate = None,
+                       *,
+                       timeout: float | None = None) -> Event:
+        """Waits for the next event that matches source, action and value and returns it.
+        Raises TimeoutError if there was none within timeout seconds. A waiting coroutine costs no thread; it is
+        kept in a table of its own that the dispatch loop resolves without starting any callbacks."""
+        if asyncio.get_running_loop() is not self.loop:
+            future = asyncio.run_coroutine_threadsafe(self.wait_for(source, action, value, timeout=timeout), self.loop)
+            return await asyncio.wrap_future(future)
+        if isinstance(value, set):
+            value = frozenset(value)
+        future: asyncio.Future[Event] = self.loop.create_future()
+
+        def resolve(event: Event) -> None:
+            if not future.done():
+                future.set_result(event)
+        condition = Condition(intern_key(source), intern_key(action), value)
+        waiter = Subscriber(resolve, True, ConcurrencyPolicy.SKIP, True, condition=condition)
+        self._waiters.add(condition, waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._waiters.remove(condition, waiter)
+
+    async def sleep(self, seconds: float) -> None:
+        """Like asyncio.sleep, but the wakeup is scheduled on the timer wheel, so any number of sleeps are cheap."""
+        if asyncio.get_running_loop() is not self.loop:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.sleep(seconds), self.loop))
+            return
+        future: asyncio.Future[None] = self.loop.create_future()
+
+        def wake() -> None:
+            if not future.done():
+                future.set_result(None)
+        timer = self.timers.call_at(self.loop.time() + seconds, wake)
+        try:
+            await future
+        finally:
+            self.timers.cancel(timer)
+
+    def call_with_frequency(self,
+                            func: Callable[[], Any],
+                            frequency: float,
+                            *,
+                            policy: OverrunPolicy = OverrunPolicy.SKIP,
+                            blocking: bool = True) -> PeriodicTask:
+        """Starts calling func frequency times per second from the timer wheel and returns the handle of the task."""
+        task = PeriodicTask(func, frequency, loop=self.loop, timers=self.timers,
+                            executors=self._executors, policy=policy, blocking=blocking)
+        self._periodic_tasks.append(task)
+        task.start()
+        return task
+
+    def add_pattern(self,
+                    pattern: EventPattern,
+                    source: EventSourceType,
+                    action: EventActionType = PATTERN_MATCHED) -> CompiledPattern:
+        """Evaluates the pattern on the event loop and fires an event from source whenever it matches.
+        The value of that event is the tuple of events that made up the match."""
+        compiled = CompiledPattern(pattern, intern_key(source), intern_key(action), self)
+        self._patterns.append(compiled)
+        return compiled
+
+    def add_worker(self, worker: "ScriptWorker") -> None:
+        """Starts a script worker process and forwards every event dispatched from now on to it."""
+        worker.start()
+        self._workers.append(worker)
+        asyncio.run_coroutine_threadsafe(worker.receive(self), self.loop)
 
     async def _poll_and_collect(self, timeout=3.0) -> list[dict[str, Any]]:
-        replies: list[dict[str, Any]] = []
-        end_time = asyncio.get_running_loop().time() + timeout
-        self._artnet.send_poll()
-        while True:
-            remaining = end_time - asyncio.get_running_loop().time()
-            if remaining <= 0:
-                break
-            try:
-                reply: dict[str, Any] = await asyncio.wait_for(self._reply_queue.get(), timeout=min(remaining, 0.1))
-                replies.append(reply)
-            except asyncio.TimeoutError:
-                pass
-        return replies
+        """Sends a poll and collects the replies for timeout seconds, after any poll that is still collecting."""
+        async with self._poll_lock:
+            replies: list[dict[str, Any]] = []
+            end_time = asyncio.get_running_loop().time() + timeout
+            self._artnet.send_poll()
+            while True:
+                remaining = end_time - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    reply: dict[str, Any] = await asyncio.wait_for(self._reply_queue.get(), timeout=min(remaining, 0.1))
+                    replies.append(reply)
+                except asyncio.TimeoutError:
+                    pass
+            return replies
 
-    def _handle_artpoll_replies(self, replies: list[dict[str, Any]]) -> None:
+    def _handle_artpoll_replies(self, replies: list[dict[str, Any]], *, count_missed_replies: bool = True) -> None:
         collected_mac_addresses: set[str] = set()  # a set of all MAC addresses from nodes that replied to our poll
         for reply in replies:
             name: str = reply['ShortName']
             mac: str = reply['Mac']
             collected_mac_addresses.add(mac)
-            if mac not in (esp.mac for esp in self._nodes):
-                if name not in (esp.name for esp in self._nodes):
+            esp: ESP32 | None = self._nodes.get_by_mac(mac)
+            if esp is None:
+                esp = self._nodes.get(name)
+                if esp is None:
                     print(f"Unknown ESP '{name}' with mac {mac} has been registered")
-                    esp = ESP32(name)
-                    esp.mac = mac
-                    esp.ip = reply["IpAddress"]
-                    esp.status = reply['NodeReport']
-                    self._nodes.append(esp)
+                    esp = self._nodes.add(ESP32(name))
                 else:
-                    esp = next((esp for esp in self._nodes if esp.name == name))
-                    esp.mac = mac
-                    esp.ip = reply["IpAddress"]
-                    esp.status = reply['NodeReport']
-                    esp.subsequent_missed_replies = 0
                     print(f"ESP '{name}' with mac {mac} connected for the first time")
-            else:
-                esp = next((esp for esp in self._nodes if esp.mac == mac), None)
-                if esp.subsequent_missed_replies > 0:
-                    print(f"ESP '{esp.name}' has regained the connection!")
-                esp.name = name
-                esp.ip = reply['IpAddress']
-                esp.status = reply['NodeReport']
-                esp.subsequent_missed_replies = 0
+            elif esp.subsequent_missed_replies > 0:
+                print(f"ESP '{esp.name}' has regained the connection!")
+            self._nodes.update(esp, name=name, mac=mac, ip=reply['IpAddress'])
+            esp.status = reply['NodeReport']
+            esp.subsequent_missed_replies = 0
+        if count_missed_replies:
+            self._count_missed_replies(collected_mac_addresses)
+        try:
+            self._nodes.save(self.NODE_REGISTRY_PATH)
+        except OSError as err:
+            print(f"Unable to save the node registry to {self.NODE_REGISTRY_PATH}: {err}")
+
+    def _count_missed_replies(self, collected_mac_addresses: set[str]) -> None:
         for esp in self._nodes:
             if esp.status == "Lost connection!" or esp.status == "Never connected":
                 continue
@@ -181,17 +344,20 @@ class EventManager:
                     esp.status = 'Lost connection!'
 
     async def _poll_loop(self, poll_interval_seconds: int = 10):
+        await self._discover_nodes()
         while True:
-            await self._poll()
             for _ in range(poll_interval_seconds):
                 await asyncio.sleep(1)
+            await self._poll()
+
+    async def _discover_nodes(self) -> None:
+        """Sends a burst of polls after startup, so that nodes are found within seconds rather than one ARTPOLL_INTERVAL.
+        Nodes that miss these polls are not counted as missing, as they may still be booting."""
+        for reply_window in self.DISCOVERY_REPLY_WINDOWS:
+            self._handle_artpoll_replies(await self._poll_and_collect(reply_window), count_missed_replies=False)
 
     async def _poll(self):
-        self._artnet.send_poll()
-        replies: list[dict[str, Any]] = []
-        while not self._reply_queue.empty():
-            replies.append(self._reply_queue.get_nowait())
-        self._handle_artpoll_replies(replies)
+        self._handle_artpoll_replies(await self._poll_and_collect(self.ARTPOLL_REPLY_WINDOW))
 
     @staticmethod
     def _get_local_ip() -> str:
@@ -221,9 +387,7 @@ class EventManager:
 
         universe = start_universe
         for node_name, node_config in manifest.items():
-            if not node_name in (node.name for node in self._nodes):
-                self._nodes.append(ESP32(node_name))
-            esp = next((esp for esp in self._nodes if esp.name == node_name), None)
+            esp = self._nodes.get(node_name) or self._nodes.add(ESP32(node_name))
             for device_name, (class_name, phys_kwargs, dummy_kwargs) in node_config["devices"].items():
                 kwargs = phys_kwargs | dummy_kwargs
                 cls = find_class_in_modules(libs, class_name)
@@ -245,15 +409,21 @@ class EventManager:
                     print(f"Type Error raised when instantiating {filtered_kwargs.get('name')}.")
                     raise
 
-                esp.devices[device.name] = device
+                self._nodes.add_device(esp, device)
+                if isinstance(device, Sensor):
+                    for action, policy in device.QUEUE_POLICIES.items():
+                        self._event_queue.set_policy(device.name, action, policy)
 
         self.devices = {name: device for esp in self._nodes for name, device in esp.devices.items()}
         self._sensor_dict = {name: device for name, device in self.devices.items() if isinstance(device, Sensor)}
+        self._sensor_index = {name.encode("ascii"): sensor for name, sensor in self._sensor_dict.items()}
         self._fixture_dict = {device.universe: device for device in self.devices.values() if isinstance(device, Fixture)}
+        self._subscriptions.register_names((name, None) for name in self.devices)
+        self._subscriptions.register_names((name, action) for name, sensor in self._sensor_dict.items()
+                                           for action in sensor.EVENT_TYPES)
 
     def _parse_trigger(self, reply: dict[str, Any], sender: tuple[str, int], ts: float):
-        if self.print_incoming_arttrigger_packets:
-            print(f"Receiving ArtTrigger event from {sender[0]}: {reply}")
+        log.debug("arttrigger", "Receiving ArtTrigger event from {}: {}", sender[0], reply)
 
         key = reply.get("Key")
         if key != KEY_CONTROL_PANEL_PROTOCOL:
@@ -272,33 +442,72 @@ class EventManager:
             return
 
         seq = reply.get("SubKey")
-        if sensor.should_ignore_seq(seq):
+        if not sensor.sequence_window.accept(seq, ts):
             return
         sensor._seq = seq
 
+        trace = current_trace.get()
+        if trace is not None:
+            trace.parsed = time.perf_counter()
         sensor.parse_trigger_payload(sensor_data, ts)
 
+    def _receive_sensor_trigger(self, data: bytes, ip: str, port: int) -> bool:
+        """The fast path for sensor packets: recognizes a control panel ArtTrigger in the raw datagram by its offsets
+        and looks the sensor up by its raw name bytes, without building a reply dict or decoding the name.
+        Returns False if the packet has to take the regular path through _receive, e.g. to log it."""
+        if (len(data) <= TRIGGER_DATA_OFFSET
+                or data[TRIGGER_KEY_OFFSET] != KEY_CONTROL_PANEL_PROTOCOL
+                or not data.startswith(TRIGGER_OP_CODE, TRIGGER_OP_CODE_OFFSET)
+                or not data.startswith(ART_NET_HEADER)
+                or log.is_enabled("arttrigger", LogLevel.DEBUG)):
+            return False
+        trace = self.tracer.begin_packet(time.perf_counter()) if self.tracer.enabled else None
+        if ip == self._ip and not self._accept_own_broadcast:
+            return True
+        name_end = data.find(b"\x00", TRIGGER_DATA_OFFSET)
+        if name_end < 0:
+            return True
+        # Slicing copies, but for names and payloads this short that is cheaper than creating memoryviews
+        sensor: Sensor | None = self._sensor_index.get(data[TRIGGER_DATA_OFFSET:name_end])
+        if sensor is None:
+            return True
+
+        seq = data[TRIGGER_SUBKEY_OFFSET]
+        ts = time.time()
+        if not sensor.sequence_window.accept(seq, ts):
+            return True
+        sensor._seq = seq
+
+        if trace is None:
+            sensor.parse_trigger_payload(data[name_end + 1:], ts)
+            return True
+        trace.parsed = time.perf_counter()
+        token = current_trace.set(trace)
+        try:
+            sensor.parse_trigger_payload(data[name_end + 1:], ts)
+        finally:
+            current_trace.reset(token)
+        return True
+
     def _parse_dmx(self, reply: dict[str, Any], sender: tuple[str, int], ts: float) -> None:
-        if not self.print_incoming_artdmx_packets:
+        if not log.is_enabled("artdmx", LogLevel.DEBUG):
             return
         universe = reply.get("Universe")
         fixture: Fixture | None = self._fixture_dict.get(universe)
-        values = [int(byte) for byte in reply.get("Data")]
         if fixture:
-            print(f"Receiving ArtDMX event from {sender[0]} to fixture {fixture.name}: {values}")
+            log.debug("artdmx", "Receiving ArtDMX event from {} to fixture {}: {}",
+                      sender[0], fixture.name, list(reply.get("Data")))
         else:
-            print(f"Receiving ArtDMX event from {sender[0]} to universe {reply.get('Universe')}: {reply.get('Data')}")
+            log.debug("artdmx", "Receiving ArtDMX event from {} to universe {}: {}", sender[0], universe, reply.get("Data"))
 
     def _parse_artpollreply(self, reply: dict[str, Any], sender: tuple[str, int], ts: float) -> None:
-        if self.print_incoming_artpollreply_packets:
-            print(f"Receiving ArtPollReply event from {sender[0]}: {reply}")
-        self.loop.call_soon_threadsafe(self._reply_queue.put_nowait, reply)
+        log.debug("artpollreply", "Receiving ArtPollReply event from {}: {}", sender[0], reply)
+        self._call_in_loop(self._reply_queue.put_nowait, reply)
 
     def _parse_artcmd(self, reply: dict[str, Any], sender: tuple[str, int], ts: float) -> None:
-        if self.print_incoming_artcmd_packets:
-            print(f"Receiving ArtCommand event from {sender[0]}: {reply.get('Command')}")
+        log.debug("artcmd", "Receiving ArtCommand event from {}: {}", sender[0], reply.get("Command"))
         if reply.get("Command") == "RETURN_PING":
-            self.loop.call_soon_threadsafe(self._ping_queue.put_nowait, reply.get("Command"))
+            self._call_in_loop(self._ping_queue.put_nowait, reply.get("Command"))
 
     def _parse_op(self, sender: tuple[str, int], ts: float, op_code: OpCode, reply: dict[str, Any]) -> None:
         match op_code:
@@ -323,15 +532,14 @@ class EventManager:
             IPv4Address(name_or_ip)
             return name_or_ip
         except ValueError:
-            try:
-                ip: str | None = next((esp for esp in self._nodes if esp.name == name_or_ip)).ip
-                if not ip:
-                    print(f"Node '{name_or_ip}' has no registered IP address.")
-                    return None
-                return ip
-            except StopIteration:
+            esp = self._nodes.get(name_or_ip)
+            if esp is None:
                 print(f"{name_or_ip} is neither a valid IPv4 address nor the name of a registered ArtNet node")
                 return None
+            if not esp.ip:
+                print(f"Node '{name_or_ip}' has no registered IP address.")
+                return None
+            return esp.ip
 
     @console_command(is_cheat_protected=True)
     def send_artcmd(self, cmd: str, name_or_ip: str | None = None) -> None:
@@ -364,7 +572,8 @@ class EventManager:
 
     @console_command(is_cheat_protected=True)
     def poll(self):
-        self.loop.create_task(self._poll())
+        """Polls the nodes, once the poll that may be in flight has collected its replies"""
+        asyncio.run_coroutine_threadsafe(self._poll(), self.loop)
 
     @console_command(is_cheat_protected=True)
     def set_dmx_attr(self, device_name: str, attribute: str, value):
@@ -373,84 +582,387 @@ class EventManager:
 
     @console_command("arttrigger_debug")
     def set_enable_print_arttrigger_packets(self, enable: int):
-        self.print_incoming_arttrigger_packets = bool(enable)
+        log.set_level("arttrigger", LogLevel.DEBUG if enable else LogLevel.INFO)
 
     @console_command("artdmx_debug")
     def set_enable_print_artdmx_packets(self, enable: int):
-        self.print_incoming_artdmx_packets = bool(enable)
+        log.set_level("artdmx", LogLevel.DEBUG if enable else LogLevel.INFO)
 
     @console_command("artcmd_debug")
     def set_enable_print_artcmd_packets(self, enable: int):
-        self.print_incoming_artcmd_packets = bool(enable)
+        log.set_level("artcmd", LogLevel.DEBUG if enable else LogLevel.INFO)
 
     @console_command("artpollreply_debug")
     def set_enable_print_artpollreply_packets(self, enable: int):
-        self.print_incoming_artpollreply_packets = bool(enable)
+        log.set_level("artpollreply", LogLevel.DEBUG if enable else LogLevel.INFO)
+
+    @console_command("log_level")
+    def set_log_level(self, category: str, level: str) -> None:
+        """Sets the level (debug, info, warning, error or off) of a log category, e.g. events, callbacks or dmx"""
+        log.set_level(category, LogLevel[level.upper()])
+
+    @console_command("log_stats")
+    def print_log_stats(self) -> None:
+        """Prints the log levels that have been changed and how many records were dropped because the buffer was full"""
+        print(f"Default level: {log.default_level.name.lower()}, dropped records: {log.dropped}")
+        for category, level in sorted(log.levels.items()):
+            print(f"- {category:<20} {level.name.lower()}")
 
     @console_command("accept_own_broadcast")
     def set_enable_accept_own_broadcast(self, enable: int):
         self._accept_own_broadcast = bool(enable)
 
+    @console_command("dispatch_stats")
+    def print_dispatch_stats(self) -> None:
+        """Prints how many events the dispatch loop has handled per batch and how long that took"""
+        stats = self.dispatch_stats
+        print(f"Dispatched {stats.events} events in {stats.batches} batches. "
+              f"Batch size mean/last/max: {stats.mean_batch_size:.1f}/{stats.last_batch_size}/{stats.max_batch_size}. "
+              f"Dispatch time mean/last/max: {1000 * stats.mean_dispatch_time:.2f}/"
+              f"{1000 * stats.last_dispatch_time:.2f}/{1000 * stats.max_dispatch_time:.2f}ms")
+        for bucket, count in sorted(stats.batch_size_histogram.items()):
+            print(f"- up to {bucket:<5} events: {count} batches")
+        print(f"{len(self._waiters)} coroutines are waiting for an event")
+
+    @console_command("queue_stats")
+    def print_queue_stats(self) -> None:
+        """Prints how many events have been queued, coalesced and dropped"""
+        stats = self._event_queue.stats
+        print(f"Queued {stats.enqueued} events, dispatched {stats.dequeued}. "
+              f"Coalesced: {stats.coalesced}, dropped: {stats.dropped}, producer waits: {stats.blocked}. "
+              f"Depth current/max: {len(self._event_queue)}/{stats.max_depth}, "
+              f"limit per lane: {self._event_queue.maxsize}")
+
+    @console_command("lane_stats")
+    def print_lane_stats(self) -> None:
+        """Prints the depth of every lane of the event queue and how long its events waited to be dispatched"""
+        print(f"{'lane':<14}{'weight':>7}{'depth':>7}{'max':>7}{'queued':>9}{'dropped':>9}"
+              f"{'wait mean':>11}{'p95':>9}{'max':>9}  (ms)")
+        for lane, stats in self._event_queue.lane_stats.items():
+            wait_times = stats.wait_times
+            print(f"{lane.value:<14}{self._event_queue.get_weight(lane):>7}{self._event_queue.depth(lane):>7}"
+                  f"{stats.max_depth:>7}{stats.enqueued:>9}{stats.dropped:>9}"
+                  f"{1000 * wait_times.mean:>11.2f}{1000 * wait_times.percentile(95):>9.2f}"
+                  f"{1000 * wait_times.maximum:>9.2f}")
+
+    @console_command(is_cheat_protected=True)
+    def set_lane_weight(self, lane: str, weight: int) -> None:
+        """Sets how large a share of every dispatch batch a lane (hardware, script or diagnostics) gets"""
+        self._event_queue.set_weight(EventLane(lane), weight)
+
+    @console_command("timer_stats")
+    def print_timer_stats(self) -> None:
+        """Prints the runs of every periodic task, how many deadlines it skipped and how late it started"""
+        print(f"{'task':<40}{'Hz':>7}{'runs':>8}{'skipped':>9}{'failed':>8}{'late p50':>10}{'p95':>9}{'max':>9}  (ms)")
+        for task in self._periodic_tasks:
+            stats = task.stats
+            name = task.name + ("" if task.is_running else " (stopped)") + (" [pool]" if task.is_offloaded else "")
+            print(f"{name:<40}{task.frequency:>7.4g}{stats.runs:>8}{stats.skipped:>9}{stats.failed:>8}"
+                  f"{1000 * stats.lateness.percentile(50):>10.1f}"
+                  f"{1000 * stats.lateness.percentile(95):>9.1f}"
+                  f"{1000 * stats.lateness.maximum:>9.1f}")
+
+    @console_command("pattern_stats")
+    def print_pattern_stats(self) -> None:
+        """Prints how often every event pattern has matched"""
+        for compiled in self._patterns:
+            state = "" if compiled.active else " (unsubscribed)"
+            print(f"- {compiled.source + ' -> ' + compiled.action + state:<60} matches: {compiled.matches}")
+
+    @console_command("bridge_stats")
+    def print_bridge_stats(self) -> None:
+        """Prints how many events have been delivered to the game loop and how many it missed"""
+        bridge = self.event_bridge
+        print(f"Delivered {bridge.delivered} events to the game loop, dropped {bridge.dropped}. "
+              f"Depth current/limit: {len(bridge)}/{bridge.maxsize}")
+
+    @console_command("worker_stats")
+    def print_worker_stats(self) -> None:
+        """Prints the events exchanged with every script worker process and how many did not fit into its rings"""
+        for worker in self._workers:
+            stats = worker.stats
+            print(f"- {worker.name:<20} pid: {worker.pid}, alive: {worker.is_alive}, "
+                  f"forwarded: {stats.forwarded}, dropped: {stats.dropped}, unpicklable: {stats.unpicklable}, "
+                  f"events fired: {stats.returned_events}, ArtNet commands: {stats.returned_commands}, "
+                  f"dropped by worker: {worker.return_ring_dropped}")
+
     @console_command(is_cheat_protected=True)
+    def set_queue_policy(self, source: str | None, action: str | None, policy: str) -> None:
+        """Sets how queued events of the given source and action are handled: latest, drop_oldest or block"""
+        self._event_queue.set_policy(source, action, QueuePolicy(policy))
+
+    @console_command("executor_stats")
+    def print_executor_stats(self) -> None:
+        """Prints the thread pool usage of every script that has run a synchronous callback"""
+        for executor in self._executors:
+            stats = executor.stats
+            timeout = f"{executor.timeout}s" if executor.timeout is not None else "none"
+            print(f"- {executor.name:<20} workers: {executor.max_workers}, timeout: {timeout}, "
+                  f"queued/max: {stats.queued}/{stats.max_queued}, running: {stats.running}, "
+                  f"completed: {stats.completed}, failed: {stats.failed}, timed out: {stats.timed_out}")
+
+    @console_command(is_cheat_protected=True)
+    def configure_script_executor(self, script_name: str, max_workers: int | None = None, timeout: float | None = None) -> None:
+        """Sets the worker count and callback timeout (0 to disable) of a script's thread pool"""
+        self._executors.configure(script_name, max_workers, timeout)
+
+    @console_command("fire_event", is_cheat_protected=True)
+    def fire_console_event(self, source: EventSourceType, action: EventActionType, value: EventValueType) -> None:
+        """Fires an event in the diagnostics lane, behind hardware and script events"""
+        self.fire_event(source, action, value, lane=EventLane.DIAGNOSTICS)
+
     def fire_event(self,
                    source: EventSourceType,
                    action: EventActionType,
                    value: EventValueType, *,
                    sender: tuple[str, int] | None = None,
-                   ts: float | None = None) -> None:
+                   ts: float | None = None,
+                   lane: EventLane = EventLane.SCRIPT) -> None:
+        self._put_event(intern_key(source), intern_key(action), value, sender, ts, lane)
+
+    def fire_template(self,
+                      template: EventTemplate,
+                      value: EventValueType, *,
+                      sender: tuple[str, int] | None = None,
+                      ts: float | None = None,
+                      lane: EventLane = EventLane.SCRIPT) -> None:
+        """Fires an event with the source and action of the template, which are interned already."""
+        self._put_event(template.source, template.action, value, sender, ts, lane)
+
+    def _put_event(self,
+                   source: EventSourceType,
+                   action: EventActionType,
+                   value: EventValueType,
+                   sender: tuple[str, int] | None,
+                   ts: float | None,
+                   lane: EventLane) -> None:
         sender = sender if sender is not None else (self._ip, ART_NET_PORT)
         ts = ts if ts is not None else time.time()
-        event = Event(source, action, value, sender, ts)
-        print(f"{'Firing event:':<16}{event.source:<20} -> {event.action:<20} -> {str(event.value):<20} from {event.sender}")
-        pg.event.post(pg.event.Event(CONTROL_PANEL_EVENT, source=event.source, name=event.action, value=event.value, sender=event.sender))
-        asyncio.run_coroutine_threadsafe(self._event_queue.put(event), self.loop)
-
-    async def _notify_subscribers(self, event: Event) -> None:
-        for key_func in self.POSSIBLE_EVENT_TYPES:
-            source, name, value = key_func(event.source, event.action, event.value)
-            subscribers: list[Subscriber] = self._callback_register.get(Condition(source, name, value), [])
-            for subscriber in subscribers:
-                if not subscriber.allow_parallelism:
-                    if subscriber.task is not None and not subscriber.task.done():
-                        print(f"[EventManager] Skipping {subscriber.callback.__name__}: still running.")
+        trace = self.tracer.begin_event(source, action) if self.tracer.enabled else None
+        event = Event(source, action, value, sender, ts, trace)
+        log.info("events", "{:<16}{!s:<20} -> {!s:<20} -> {!s:<20} from {}",
+                 "Firing event:", event.source, event.action, event.value, event.sender)
+        self._event_queue.put(event, lane)
+
+    async def _notify_subscribers(self, event: Event, subscribers: tuple[Subscriber, ...]) -> None:
+        """Starts the callbacks of the given subscribers, skipping those that have been removed in the meantime.
+        Subscribers whose callback is still running handle the event according to their ConcurrencyPolicy."""
+        for subscriber in subscribers:
+            if not subscriber.active:
+                continue
+            if subscriber.task is not None and not subscriber.task.done():
+                policy = subscriber.concurrency
+                stats = subscriber.stats
+                if policy is ConcurrencyPolicy.SKIP:
+                    stats.skipped += 1
+                    log.info("callbacks", "[EventManager] Skipping {}: still running.", subscriber.name)
+                    continue
+                if policy is ConcurrencyPolicy.QUEUE:
+                    if len(subscriber.pending) >= subscriber.max_pending:
+                        stats.overflowed += 1
+                        log.info("callbacks", "[EventManager] Dropping event for {}: {} events are waiting already.",
+                                 subscriber.name, len(subscriber.pending))
                         continue
-                print(f"{'Event received: ':<16}{subscriber.callback.__module__.rsplit('.')[-1]}.{subscriber.callback.__name__}")
-
-                if inspect.iscoroutinefunction(subscriber.callback):
-                    if subscriber.requires_event_arg:
-                        task = asyncio.create_task(subscriber.callback(event))
-                    else:
-                        task = asyncio.create_task(subscriber.callback())
-                    subscriber.task = task
-                else:
-                    # Run sync function in a thread, wrap it in a future
-                    if subscriber.requires_event_arg:
-                        task = asyncio.to_thread(subscriber.callback, event)
-                    else:
-                        task = asyncio.to_thread(subscriber.callback)
-                    subscriber.task = asyncio.create_task(task)
-
-                if subscriber.fire_once:
-                    subscribers.remove(subscriber)
+                    subscriber.pending.append(event)
+                    stats.deferred += 1
+                    stats.max_pending = max(stats.max_pending, len(subscriber.pending))
+                    continue
+                if policy is ConcurrencyPolicy.LATEST:
+                    if subscriber.pending:
+                        stats.superseded += 1
+                        subscriber.pending.clear()
+                    subscriber.pending.append(event)
+                    stats.deferred += 1
+                    stats.max_pending = max(stats.max_pending, 1)
+                    continue
+                if policy is ConcurrencyPolicy.RESTART:
+                    subscriber.task.cancel()
+                    stats.restarted += 1
+            self._start_callback(subscriber, event)
+
+            if subscriber.fire_once:
+                self._subscriptions.remove(subscriber.condition, subscriber)
+
+    def _start_callback(self, subscriber: Subscriber, event: Event) -> None:
+        log.info("events", "{:<16}{}", "Event received: ", subscriber.name)
+        if inspect.iscoroutinefunction(subscriber.callback):
+            subscriber.task = asyncio.create_task(self._run_coroutine_callback(subscriber, event))
+        else:
+            # Run sync function in the thread pool of its script, wrap it in a future
+            subscriber.task = asyncio.create_task(self._run_sync_callback(subscriber, event))
+        if subscriber.concurrency is ConcurrencyPolicy.QUEUE or subscriber.concurrency is ConcurrencyPolicy.LATEST:
+            subscriber.task.add_done_callback(lambda _: self._start_pending(subscriber))
+
+    def _start_pending(self, subscriber: Subscriber) -> None:
+        """Starts the callback with the next waiting event, once the previous run has finished."""
+        if not subscriber.active:
+            subscriber.pending.clear()
+        elif subscriber.pending:
+            self._start_callback(subscriber, subscriber.pending.popleft())
+
+    async def _run_coroutine_callback(self, subscriber: Subscriber, event: Event) -> None:
+        subscriber.stats.record_start(max(0.0, time.time() - event.timestamp))
+        current_trace.set(event.trace)  # the task runs in its own copy of the context
+        start = time.perf_counter()
+        try:
+            await (subscriber.callback(event) if subscriber.requires_event_arg else subscriber.callback())
+        finally:
+            # Coroutines may legitimately await for a long time, so they are not reported as slow
+            end = time.perf_counter()
+            subscriber.stats.record_execution(end - start)
+            if event.trace is not None:
+                self.tracer.record_callback(event.trace, subscriber.name, start, end)
+
+    async def _run_sync_callback(self, subscriber: Subscriber, event: Event) -> None:
+        executor = self._executors.for_callback(subscriber.callback)
+        try:
+            await executor.run(self._call_sync_callback, subscriber, event)
+        except asyncio.TimeoutError:
+            log.warning("callbacks", "[EventManager] {} did not finish within {}s and keeps running in the background.",
+                        subscriber.name, executor.timeout)
+
+    def _call_sync_callback(self, subscriber: Subscriber, event: Event) -> None:
+        """Runs in a worker thread of the subscriber's script."""
+        subscriber.stats.record_start(max(0.0, time.time() - event.timestamp))
+        current_trace.set(event.trace)  # the executor runs every callback in a copy of the context
+        start = time.perf_counter()
+        try:
+            subscriber.callback(event) if subscriber.requires_event_arg else subscriber.callback()
+        finally:
+            end = time.perf_counter()
+            execution_time = end - start
+            subscriber.stats.record_execution(execution_time)
+            if event.trace is not None:
+                self.tracer.record_callback(event.trace, subscriber.name, start, end)
+            if execution_time > self.slow_callback_threshold:
+                log.warning("callbacks", "[EventManager] Slow callback: {} took {:.0f}ms", subscriber.name, 1000 * execution_time)
+
+    def get_callback_stats(self) -> dict[str, SubscriberStats]:
+        """Returns the profile of every subscriber, keyed by callback name and condition."""
+        return {f"{subscriber.name} {subscriber.condition}": subscriber.stats
+                for subscriber in self._subscriptions.subscribers()}
+
+    @console_command("callback_stats")
+    def print_callback_stats(self, count: int = 20) -> None:
+        """Prints the callbacks that have spent the most time executing"""
+        subscribers = sorted(self._subscriptions.subscribers(), key=lambda s: s.stats.total_execution_time, reverse=True)
+        print(f"{'callback':<40}{'calls':>7}{'skipped':>9}{'queued':>9}{'p50':>9}{'p95':>9}{'max':>9}  (ms)")
+        for subscriber in subscribers[:count]:
+            stats = subscriber.stats
+            print(f"{subscriber.name:<40}{stats.invocations:>7}{stats.skipped:>9}"
+                  f"{1000 * stats.mean_queue_time:>9.1f}"
+                  f"{1000 * stats.execution_time_percentile(50):>9.1f}"
+                  f"{1000 * stats.execution_time_percentile(95):>9.1f}"
+                  f"{1000 * stats.max_execution_time:>9.1f}")
+
+    @console_command("concurrency_stats")
+    def print_concurrency_stats(self) -> None:
+        """Prints what happened to the events that arrived while a callback was still running"""
+        print(f"{'callback':<40}{'policy':>10}{'skipped':>9}{'deferred':>10}{'overflow':>10}{'superseded':>12}"
+              f"{'restarted':>11}{'waiting':>9}{'max':>5}")
+        for subscriber in self._subscriptions.subscribers():
+            if subscriber.concurrency is ConcurrencyPolicy.PARALLEL:
+                continue
+            stats = subscriber.stats
+            print(f"{subscriber.name:<40}{subscriber.concurrency.value:>10}{stats.skipped:>9}{stats.deferred:>10}"
+                  f"{stats.overflowed:>10}{stats.superseded:>12}{stats.restarted:>11}"
+                  f"{len(subscriber.pending):>9}{stats.max_pending:>5}")
+
+    @console_command("sequence_stats")
+    def print_sequence_stats(self, per_sensor: int = 0) -> None:
+        """Prints how many sensor packets were duplicates, arrived out of order or got lost, per node (or per sensor)"""
+        rows: list[tuple[str, SequenceStats]] = []
+        for esp in self._nodes:
+            sensors = [device for device in esp.devices.values() if isinstance(device, Sensor)]
+            if per_sensor:
+                rows += [(sensor.name, sensor.sequence_window.stats) for sensor in sensors]
+                continue
+            node_stats = SequenceStats()
+            for sensor in sensors:
+                node_stats += sensor.sequence_window.stats
+            rows.append((esp.name, node_stats))
+        print(f"{'sensor' if per_sensor else 'node':<32}{'accepted':>10}{'dupes':>8}{'late':>8}{'lost':>8}{'resets':>8}")
+        for name, stats in rows:
+            print(f"{name:<32}{stats.accepted:>10}{stats.duplicates:>8}{stats.out_of_order:>8}"
+                  f"{stats.lost:>8}{stats.resets:>8}")
+
+    @console_command("tracing")
+    def set_enable_tracing(self, enable: int) -> None:
+        """Enables or disables latency tracing from packet receipt to DMX output. Enabling it clears old traces"""
+        if enable and not self.tracer.enabled:
+            self.tracer.reset()
+        self.tracer.enabled = bool(enable)
+
+    @console_command("latency_stats")
+    def print_latency_stats(self) -> None:
+        """Prints the traced latencies from a sensor's packet to the DMX output of a fixture, per device pair"""
+        if not self.tracer.latencies:
+            print("No latencies recorded." + ("" if self.tracer.enabled else " Enable them with 'tracing 1'."))
+            return
+        print(f"{'sensor -> fixture':<48}{'count':>7}{'mean':>9}{'p50':>9}{'p95':>9}{'max':>9}  (ms)")
+        for (sensor, fixture), histogram in sorted(self.tracer.latencies.items()):
+            print(f"{f'{sensor} -> {fixture}':<48}{histogram.count:>7}"
+                  f"{1000 * histogram.mean:>9.1f}"
+                  f"{1000 * histogram.percentile(50):>9.1f}"
+                  f"{1000 * histogram.percentile(95):>9.1f}"
+                  f"{1000 * histogram.maximum:>9.1f}")
+
+    @console_command("export_trace")
+    def export_trace(self, filename: str = "controlpanel_trace.json") -> None:
+        """Writes the recorded traces as Chrome trace-event JSON (open it in chrome://tracing or ui.perfetto.dev)"""
+        count = self.tracer.export_chrome_trace(filename)
+        print(f"Exported {count} trace events to {filename}.")
+
+    @console_command("slow_callback_threshold")
+    def set_slow_callback_threshold(self, seconds: float) -> None:
+        """Sets the execution time above which a synchronous callback is reported as slow"""
+        self.slow_callback_threshold = seconds
 
     def _receive(self, op_code: OpCode, ip: str, port: int, reply: Any) -> None:
         if ip == self._ip and not self._accept_own_broadcast:
             return  # ignore packet if it's ours
         sender = (ip, port)
         ts = time.time()
-        self._parse_op(sender, ts, op_code, reply)
+        if not self.tracer.enabled:
+            self._parse_op(sender, ts, op_code, reply)
+            return
+        token = current_trace.set(self.tracer.begin_packet(time.perf_counter()))
+        try:
+            self._parse_op(sender, ts, op_code, reply)
+        finally:
+            current_trace.reset(token)
 
     def subscribe(self,
                   callback: CallbackType,
-                  source: EventSourceType,
-                  action: EventActionType,
-                  value: EventValueType = None,
+                  source: EventSourceType | re.Pattern | None,
+                  action: EventActionType | re.Pattern | None,
+                  value: EventValueType | ValuePredicate = None,
                   *,
                   fire_once: bool = False,
-                  allow_parallelism: bool = False) -> None:
+                  allow_parallelism: bool = False,
+                  queue_policy: QueuePolicy | None = None,
+                  concurrency: ConcurrencyPolicy | None = None,
+                  max_pending: int = Subscriber.DEFAULT_MAX_PENDING) -> Subscription:
+        """Subscribes the callback to the events that match source, action and value.
+        concurrency decides what happens to events that arrive while the callback is still running. It defaults to
+        PARALLEL if allow_parallelism is set and to SKIP otherwise. max_pending bounds the events a QUEUE subscriber
+        keeps waiting. Returns a handle whose unsubscribe() removes the subscription again in constant time."""
         arg_count = callback.__code__.co_argcount
         is_method = inspect.ismethod(callback)
         requires_event_arg = arg_count == 1 if not is_method else arg_count == 2
-        subscriber = Subscriber(callback, fire_once, allow_parallelism, requires_event_arg)
+        if concurrency is None:
+            concurrency = ConcurrencyPolicy.PARALLEL if allow_parallelism else ConcurrencyPolicy.SKIP
+        if concurrency is ConcurrencyPolicy.RESTART and not inspect.iscoroutinefunction(callback):
+            raise ValueError("Only coroutine callbacks can be restarted, a running thread cannot be cancelled")
+        if isinstance(value, set):
+            value = frozenset(value)
+        source, action = intern_key(source), intern_key(action)
         condition = Condition(source, action, value)
-        self._callback_register[condition].append(subscriber)
+        subscriber = Subscriber(callback, fire_once, concurrency, requires_event_arg, condition=condition,
+                                max_pending=max_pending)
+        if queue_policy is not None and (compile_pattern(source) is not None or compile_pattern(action) is not None):
+            raise ValueError("Queue policies can only be set for exact sources and actions")
+        self._subscriptions.add(condition, subscriber)
+        if queue_policy is not None:
+            self._event_queue.set_policy(source, action, queue_policy)
+        return Subscription(subscriber, self._subscriptions)
@@ -0,0 +1,271 @@
+import re
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, TYPE_CHECKING
+from .commons import Event, EventSourceType, EventActionType, EventValueType, ValuePredicate, ConcurrencyPolicy
+from .subscriptions import Subscription
+from .timer_wheel import Timer
+
+if TYPE_CHECKING:
+    from .event_manager import EventManager
+
+
+PATTERN_MATCHED: EventActionType = "PatternMatched"  # the action of the events that matched patterns fire
+
+Match = tuple[Event, ...]  # the events that satisfied a pattern, in the order in which they arrived
+Emit = Callable[[Match], None]
+
+
+class EventPattern(ABC):
+    """A condition over several events, built from on() and the operators below.
+
+    EventManager.add_pattern compiles a pattern into one state machine per operator, which is updated incrementally
+    on the event loop as the events of its steps arrive, so scripts neither poll device states nor rebuild the state
+    of a puzzle from scratch. Operators take patterns as their steps, so they can be nested. Time windows are measured
+    between the timestamps of the events.
+    """
+    steps: tuple["EventPattern", ...]
+
+    def compile(self, event_manager: "EventManager", emit: Emit) -> list[Subscription]:
+        """Subscribes the state machine of this pattern to the events of its steps. emit is called with every match."""
+        state = self._new_state(event_manager, emit)
+        subscriptions: list[Subscription] = []
+        for index, step in enumerate(self.steps):
+            subscriptions += step.compile(event_manager, partial(state.feed, index))
+        return subscriptions
+
+    @abstractmethod
+    def _new_state(self, event_manager: "EventManager", emit: Emit) -> "_State":
+        pass
+
+
+class _State(ABC):
+    @abstractmethod
+    def feed(self, index: int, match: Match) -> None:
+        pass
+
+
+@dataclass(frozen=True)
+class On(EventPattern):
+    """Matches every single event with the given source, action and value, like a callback would."""
+    source: EventSourceType | re.Pattern | None = None
+    action: EventActionType | re.Pattern | None = None
+    value: EventValueType | ValuePredicate = None
+
+    def compile(self, event_manager: "EventManager", emit: Emit) -> list[Subscription]:
+        # A coroutine callback runs on the event loop, so the state machines are never updated concurrently
+        async def matched(event: Event) -> None:
+            emit((event,))
+        return [event_manager.subscribe(matched, self.source, self.action, self.value,
+                                        concurrency=ConcurrencyPolicy.PARALLEL)]
+
+    def _new_state(self, event_manager: "EventManager", emit: Emit) -> "_State":
+        raise TypeError("On matches single events through its subscription, it has no state machine")
+
+
+@dataclass(frozen=True)
+class Sequence(EventPattern):
+    steps: tuple[EventPattern, ...]
+    within: float | None = None
+
+    def _new_state(self, event_manager: "EventManager", emit: Emit) -> "_State":
+        return _SequenceState(self, emit)
+
+
+class _SequenceState(_State):
+    def __init__(self, pattern: Sequence, emit: Emit) -> None:
+        self._pattern: Sequence = pattern
+        self._emit: Emit = emit
+        self._matched: list[Event] = []
+        self._position: int = 0
+
+    def feed(self, index: int, match: Match) -> None:
+        within = self._pattern.within
+        if self._position and within is not None and match[-1].timestamp - self._matched[0].timestamp > within:
+            self._matched, self._position = [], 0
+        if index == self._position:
+            self._matched += match
+            self._position += 1
+        elif index == 0:
+            self._matched, self._position = list(match), 1  # the first step again starts the sequence over
+        else:
+            return  # events that do not continue the sequence are ignored
+        if self._position == len(self._pattern.steps):
+            matched = tuple(self._matched)
+            self._matched, self._position = [], 0
+            self._emit(matched)
+
+
+@dataclass(frozen=True)
+class AllOf(EventPattern):
+    steps: tuple[EventPattern, ...]
+    within: float | None = None
+
+    def _new_state(self, event_manager: "EventManager", emit: Emit) -> "_State":
+        return _AllOfState(self, emit)
+
+
+class _AllOfState(_State):
+    def __init__(self, pattern: AllOf, emit: Emit) -> None:
+        self._pattern: AllOf = pattern
+        self._emit: Emit = emit
+        self._latest: list[Match | None] = [None] * len(pattern.steps)
+
+    def feed(self, index: int, match: Match) -> None:
+        self._latest[index] = match
+        within = self._pattern.within
+        if within is not None:
+            now = match[-1].timestamp
+            for i, latest in enumerate(self._latest):
+                if latest is not None and now - latest[0].timestamp > within:
+                    self._latest[i] = None
+        if all(latest is not None for latest in self._latest):
+            matched = tuple(sorted((event for latest in self._latest for event in latest), key=lambda e: e.timestamp))
+            self._latest = [None] * len(self._latest)
+            self._emit(matched)
+
+
+@dataclass(frozen=True)
+class Count(EventPattern):
+    steps: tuple[EventPattern]
+    times: int
+    within: float | None = None
+
+    def _new_state(self, event_manager: "EventManager", emit: Emit) -> "_State":
+        return _CountState(self, emit)
+
+
+class _CountState(_State):
+    def __init__(self, pattern: Count, emit: Emit) -> None:
+        self._pattern: Count = pattern
+        self._emit: Emit = emit
+        self._matches: deque[Match] = deque()
+
+    def feed(self, index: int, match: Match) -> None:
+        self._matches.append(match)
+        within = self._pattern.within
+        if within is not None:
+            now = match[-1].timestamp
+            while now - self._matches[0][0].timestamp > within:
+                self._matches.popleft()
+        if len(self._matches) >= self._pattern.times:
+            matched = tuple(event for m in self._matches for event in m)
+            self._matches.clear()
+            self._emit(matched)
+
+
+@dataclass(frozen=True)
+class Debounce(EventPattern):
+    steps: tuple[EventPattern]
+    quiet: float
+
+    def _new_state(self, event_manager: "EventManager", emit: Emit) -> "_State":
+        return _DebounceState(self, event_manager, emit)
+
+
+class _DebounceState(_State):
+    def __init__(self, pattern: Debounce, event_manager: "EventManager", emit: Emit) -> None:
+        self._pattern: Debounce = pattern
+        self._event_manager: "EventManager" = event_manager
+        self._emit: Emit = emit
+        self._last: Match | None = None
+        self._timer: Timer | None = None
+
+    def feed(self, index: int, match: Match) -> None:
+        self._last = match
+        timers = self._event_manager.timers
+        if self._timer is not None:
+            timers.cancel(self._timer)
+        self._timer = timers.call_at(self._event_manager.loop.time() + self._pattern.quiet, self._settled)
+
+    def _settled(self) -> None:
+        matched, self._last, self._timer = self._last, None, None
+        self._emit(matched)
+
+
+@dataclass(frozen=True)
+class Throttle(EventPattern):
+    steps: tuple[EventPattern]
+    interval: float
+
+    def _new_state(self, event_manager: "EventManager", emit: Emit) -> "_State":
+        return _ThrottleState(self, emit)
+
+
+class _ThrottleState(_State):
+    def __init__(self, pattern: Throttle, emit: Emit) -> None:
+        self._pattern: Throttle = pattern
+        self._emit: Emit = emit
+        self._last_emitted: float | None = None
+
+    def feed(self, index: int, match: Match) -> None:
+        now = match[-1].timestamp
+        if self._last_emitted is not None and now - self._last_emitted < self._pattern.interval:
+            return
+        self._last_emitted = now
+        self._emit(match)
+
+
+class CompiledPattern:
+    """A pattern that is being evaluated. Returned by EventManager.add_pattern."""
+
+    def __init__(self,
+                 pattern: EventPattern,
+                 source: EventSourceType,
+                 action: EventActionType,
+                 event_manager: "EventManager") -> None:
+        self.pattern: EventPattern = pattern
+        self.source: EventSourceType = source
+        self.action: EventActionType = action
+        self.matches: int = 0
+        self.active: bool = True
+        self._event_manager: "EventManager" = event_manager
+        self._subscriptions: list[Subscription] = pattern.compile(event_manager, self._emit)
+
+    def unsubscribe(self) -> None:
+        """Stops evaluating the pattern. Idempotent."""
+        self.active = False
+        for subscription in self._subscriptions:
+            subscription.unsubscribe()
+        self._subscriptions.clear()
+
+    def _emit(self, match: Match) -> None:
+        if not self.active:
+            return  # a debounce timer that was still pending
+        self.matches += 1
+        self._event_manager.fire_event(self.source, self.action, match)
+
+
+def on(source: EventSourceType | re.Pattern | None = None,
+       action: EventActionType | re.Pattern | None = None,
+       value: EventValueType | ValuePredicate = None) -> On:
+    return On(source, action, value)
+
+
+def sequence(*steps: EventPattern, within: float | None = None) -> Sequence:
+    """Matches the steps in this order, with any other events in between, the first to the last within seconds."""
+    return Sequence(steps, within)
+
+
+def all_of(*steps: EventPattern, within: float | None = None) -> AllOf:
+    """Matches once every step has matched, in any order, the first to the last within seconds."""
+    return AllOf(steps, within)
+
+
+def count(step: EventPattern, times: int, *, within: float | None = None) -> Count:
+    """Matches once the step has matched the given number of times within a sliding window of seconds."""
+    if times < 1:
+        raise ValueError("A count pattern needs to match at least once")
+    return Count((step,), times, within)
+
+
+def debounce(step: EventPattern, quiet: float) -> Debounce:
+    """Matches the last match of the step, once the step has not matched for quiet seconds."""
+    return Debounce((step,), quiet)
+
+
+def throttle(step: EventPattern, interval: float) -> Throttle:
+    """Matches the step at most once per interval of seconds, dropping the matches in between."""
+    return Throttle((step,), interval)
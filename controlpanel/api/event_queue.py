@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from enum import Enum
+from .commons import Event, EventSourceType, EventActionType
+from .stats import QueueStats, LaneStats
+
+
+class QueuePolicy(Enum):
+    """What happens to an event of a given (source, action) when it is queued."""
+    LATEST = "latest"  # a queued event of the same (source, action) is replaced, so only the latest value is dispatched
+    DROP_OLDEST = "drop_oldest"  # if the queue is full, the oldest queued event is dropped to make room
+    BLOCK = "block"  # if the queue is full, the producer waits until there is room
+
+
+class EventLane(Enum):
+    """Where an event comes from, which decides how much of every batch its events get."""
+    HARDWARE = "hardware"  # sensor input from the ArtNet nodes
+    SCRIPT = "script"  # events fired by scripts and games
+    DIAGNOSTICS = "diagnostics"  # events injected from the developer console
+
+
+PolicyKey = tuple[EventSourceType | None, EventActionType | None]
+
+
+class EventQueue:
+    """A bounded, thread-safe queue that is filled from any thread and drained in batches on the event loop.
+
+    Every EventLane has a queue of its own, bounded by maxsize, so that a chatty script can neither evict nor delay
+    hardware input. The queue as a whole therefore holds up to len(EventLane) * maxsize events. A batch takes up to
+    weight * BATCH_QUANTUM events from every lane (weighted round robin), hardware first, and the consumer is expected
+    to yield to the event loop between batches.
+
+    Events are stored in two-item lists ("cells") of event and enqueue time, so that an event with the LATEST policy
+    can overwrite its queued predecessor in place while keeping its position in the queue. Only a predecessor in the
+    same lane is overwritten, as the event would otherwise be dispatched with the priority of the other lane.
+    """
+    BATCH_QUANTUM: int = 32
+    DEFAULT_LANE_WEIGHTS: dict[EventLane, int] = {EventLane.HARDWARE: 8, EventLane.SCRIPT: 2, EventLane.DIAGNOSTICS: 1}
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int, default_policy: QueuePolicy) -> None:
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._maxsize: int = maxsize
+        self._default_policy: QueuePolicy = default_policy
+        self._policies: dict[PolicyKey, QueuePolicy] = dict()
+        self._lanes: dict[EventLane, deque[list]] = {lane: deque() for lane in EventLane}  # in order of priority
+        self._weights: dict[EventLane, int] = dict(self.DEFAULT_LANE_WEIGHTS)
+        self._size: int = 0
+        self._latest_cells: dict[EventLane, dict[PolicyKey, list]] = {lane: dict() for lane in EventLane}
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._not_empty = asyncio.Event()
+        self._consumer_waiting: bool = False
+        self._consumer_thread_id: int | None = None
+        self.stats: QueueStats = QueueStats()
+        self.lane_stats: dict[EventLane, LaneStats] = {lane: LaneStats() for lane in EventLane}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def maxsize(self) -> int:
+        """The capacity of every lane, not of the queue as a whole."""
+        return self._maxsize
+
+    def depth(self, lane: EventLane) -> int:
+        return len(self._lanes[lane])
+
+    def get_weight(self, lane: EventLane) -> int:
+        return self._weights[lane]
+
+    def set_weight(self, lane: EventLane, weight: int) -> None:
+        """Sets how many BATCH_QUANTUMs of events the lane contributes to every batch."""
+        if weight < 1:
+            raise ValueError("Lane weights must be at least 1, or the lane would never be dispatched")
+        self._weights[lane] = weight
+
+    def set_policy(self, source: EventSourceType | None, action: EventActionType | None, policy: QueuePolicy) -> None:
+        """Sets the policy for events of the given source and action. None matches any source or action."""
+        if source is None and action is None:
+            self._default_policy = policy
+        else:
+            self._policies[(source, action)] = policy
+
+    def get_policy(self, source: EventSourceType, action: EventActionType) -> QueuePolicy:
+        if not self._policies:
+            return self._default_policy
+        return (self._policies.get((source, action)) or
+                self._policies.get((source, None)) or
+                self._policies.get((None, action)) or
+                self._default_policy)
+
+    def put(self, event: Event, lane: EventLane = EventLane.SCRIPT) -> None:
+        """Queues the event in the given lane according to its policy. Safe to call from any thread."""
+        key: PolicyKey = (event.source, event.action)
+        policy = self.get_policy(event.source, event.action)
+        cells = self._lanes[lane]
+        latest_cells = self._latest_cells[lane]
+        lane_stats = self.lane_stats[lane]
+        with self._lock:
+            self.stats.enqueued += 1
+            lane_stats.enqueued += 1
+            if policy is QueuePolicy.LATEST:
+                cell = latest_cells.get(key)
+                if cell is not None:
+                    cell[0] = event
+                    self.stats.coalesced += 1
+                    lane_stats.coalesced += 1
+                    return
+            while len(cells) >= self._maxsize:
+                if policy is QueuePolicy.BLOCK and threading.get_ident() != self._consumer_thread_id:
+                    self.stats.blocked += 1
+                    self._not_full.wait()
+                    continue
+                # The event loop must never block on itself, so it drops the oldest event even for BLOCK events
+                self._forget(latest_cells, cells.popleft())
+                self._size -= 1
+                self.stats.dropped += 1
+                lane_stats.dropped += 1
+            cell = [event, time.perf_counter()]
+            cells.append(cell)
+            self._size += 1
+            if policy is QueuePolicy.LATEST:
+                latest_cells[key] = cell
+            self.stats.max_depth = max(self.stats.max_depth, self._size)
+            lane_stats.max_depth = max(lane_stats.max_depth, len(cells))
+            wake_consumer = self._consumer_waiting
+            self._consumer_waiting = False
+        if wake_consumer:
+            if threading.get_ident() == self._consumer_thread_id:
+                self._not_empty.set()
+            else:
+                self._loop.call_soon_threadsafe(self._not_empty.set)
+
+    async def get_batch(self) -> list[Event]:
+        """Waits until at least one event is queued, then removes and returns the next batch of events."""
+        self._consumer_thread_id = threading.get_ident()
+        while True:
+            with self._lock:
+                if self._size:
+                    now = time.perf_counter()
+                    events: list[Event] = []
+                    for lane, cells in self._lanes.items():
+                        count = min(len(cells), self._weights[lane] * self.BATCH_QUANTUM)
+                        if not count:
+                            continue
+                        wait_times = self.lane_stats[lane].wait_times
+                        latest_cells = self._latest_cells[lane]
+                        for _ in range(count):
+                            cell = cells.popleft()
+                            self._forget(latest_cells, cell)
+                            wait_times.add(now - cell[1])
+                            events.append(cell[0])
+                        self.lane_stats[lane].dequeued += count
+                    self._size -= len(events)
+                    self.stats.dequeued += len(events)
+                    self._not_full.notify_all()
+                    return events
+                self._not_empty.clear()
+                self._consumer_waiting = True
+            await self._not_empty.wait()
+
+    @staticmethod
+    def _forget(latest_cells: dict[PolicyKey, list], cell: list) -> None:
+        key: PolicyKey = (cell[0].source, cell[0].action)
+        if latest_cells.get(key) is cell:
+            del latest_cells[key]
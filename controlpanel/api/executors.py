@@ -0,0 +1,111 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any
+from controlpanel import api
+from .stats import ExecutorStats
+
+
+class ScriptExecutor:
+    """A thread pool reserved for the synchronous callbacks of a single script,
+    so that one slow script cannot occupy the workers every other script depends on."""
+
+    def __init__(self, name: str, max_workers: int, timeout: float | None) -> None:
+        self.name: str = name
+        self.timeout: float | None = timeout
+        self._max_workers: int = max_workers
+        self._pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers, thread_name_prefix=f"script-{name}")
+        self._lock = threading.Lock()
+        self.stats: ExecutorStats = ExecutorStats()
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    @max_workers.setter
+    def max_workers(self, max_workers: int) -> None:
+        if max_workers == self._max_workers:
+            return
+        old_pool = self._pool
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix=f"script-{self.name}")
+        self._max_workers = max_workers
+        old_pool.shutdown(wait=False)  # callbacks that are already running or queued finish in the old pool
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Runs func in this pool and waits for its result.
+        Raises asyncio.TimeoutError if the timeout (if any) passes first, in which case func keeps running."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.stats.submitted += 1
+            self.stats.queued += 1
+            self.stats.max_queued = max(self.stats.max_queued, self.stats.queued)
+        future = loop.run_in_executor(self._pool, self._call, contextvars.copy_context(), func, args)
+        if self.timeout is None:
+            return await future
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.stats.timed_out += 1
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())  # nobody awaits it anymore
+            raise
+
+    def _call(self, context: contextvars.Context, func: Callable[..., Any], args: tuple[Any, ...]) -> Any:
+        with self._lock:
+            self.stats.queued -= 1
+            self.stats.running += 1
+        try:
+            return context.run(func, *args)
+        except Exception:
+            with self._lock:
+                self.stats.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.stats.running -= 1
+                self.stats.completed += 1
+
+
+class ScriptExecutors:
+    """Hands out one ScriptExecutor per loaded script.
+
+    A script can configure its pool with the module-level constants EXECUTOR_MAX_WORKERS and EXECUTOR_TIMEOUT.
+    Callbacks that do not belong to any loaded script share the default pool.
+    """
+    DEFAULT_POOL_NAME: str = "default"
+    DEFAULT_MAX_WORKERS: int = 4
+
+    def __init__(self) -> None:
+        self._executors: dict[str, ScriptExecutor] = dict()
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return iter(list(self._executors.values()))
+
+    def get(self, script_name: str) -> ScriptExecutor:
+        executor = self._executors.get(script_name)
+        if executor is not None:
+            return executor
+        with self._lock:
+            if script_name not in self._executors:
+                module = api.loaded_scripts.get(script_name)
+                max_workers: int = getattr(module, "EXECUTOR_MAX_WORKERS", self.DEFAULT_MAX_WORKERS)
+                timeout: float | None = getattr(module, "EXECUTOR_TIMEOUT", None)
+                self._executors[script_name] = ScriptExecutor(script_name, max_workers, timeout)
+            return self._executors[script_name]
+
+    def for_callback(self, callback: Callable[..., Any]) -> ScriptExecutor:
+        script_name = callback.__module__.split(".", maxsplit=1)[0]
+        if script_name not in api.loaded_scripts:
+            script_name = self.DEFAULT_POOL_NAME
+        return self.get(script_name)
+
+    def configure(self, script_name: str, max_workers: int | None = None, timeout: float | None = None) -> None:
+        """Changes the pool of the given script. Parameters that are None are left as they are, a timeout of 0 disables
+        the timeout."""
+        executor = self.get(script_name)
+        if max_workers is not None:
+            executor.max_workers = max_workers
+        if timeout is not None:
+            executor.timeout = timeout if timeout > 0 else None
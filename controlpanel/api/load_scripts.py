@@ -2,6 +2,7 @@ import sys
 import os
 import importlib
 from .services import Services
+from .workers import ScriptWorker, WORKER_PREFIX
 import pathlib
 
 
@@ -11,6 +12,7 @@ sys.path.append(str(pathlib.Path(__file__).parent.parent.resolve() / "scripts"))
 def load_scripts(args: list[str]) -> None:
     """
     This is where we load our "user scripts" on boot, by taking in a list of script file names, and then importing them.
+    Scripts whose name is prefixed with "worker:" (e.g. "worker:gameoflife") are loaded into a process of their own.
     """
 
     # First, we "unpack" all .txt files
@@ -28,9 +30,15 @@ def load_scripts(args: list[str]) -> None:
 
     failed: list[tuple[str, Exception, str]] = []
     success: list[tuple[str, set[str]]] = []
+    workers: list[str] = []
     for arg in args:
         if arg.endswith(".py"):
             arg = arg.removesuffix(".py")
+        if arg.startswith(WORKER_PREFIX):
+            script_name = arg.removeprefix(WORKER_PREFIX)
+            Services.event_manager.add_worker(ScriptWorker(script_name))
+            workers.append(script_name)
+            continue
         try:
             original_modules = set(sys.modules.keys())
             imported_module = importlib.import_module(arg, package=__name__)
@@ -59,6 +67,11 @@ def load_scripts(args: list[str]) -> None:
             for dependency in dependencies:
                 print(f"- {dependency:<15} (dependency of {script})")
 
+    if workers:
+        print("Started worker processes for the following scripts:")
+        for script in workers:
+            print(f"- {script}")
+
     if failed:
         import traceback
         print("Failed to load the following scripts:")
@@ -0,0 +1,119 @@
+import atexit
+import threading
+import time
+from enum import IntEnum
+from typing import Any
+
+
+class LogLevel(IntEnum):
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+    OFF = 100
+
+
+class RingBufferLogger:
+    """Hands log records to a background writer thread through a preallocated ring buffer, so that logging on a hot
+    path costs a few assignments instead of console I/O.
+
+    Every record has a category with its own level, which can be changed at runtime. Messages are formatted with
+    str.format by the writer thread, so arguments should be passed separately rather than as an f-string.
+    When the buffer is full, new records are dropped and counted instead of blocking the caller.
+    """
+    DEFAULT_CAPACITY: int = 4096
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, default_level: LogLevel = LogLevel.INFO) -> None:
+        # slot layout: timestamp, category, level, message, args
+        self._slots: list[list[Any]] = [[0.0, "", LogLevel.INFO, "", ()] for _ in range(capacity)]
+        self._capacity: int = capacity
+        self._head: int = 0  # number of records ever written
+        self._tail: int = 0  # number of records ever handed to the writer
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending = threading.Event()
+        self._writer: threading.Thread | None = None
+        self._levels: dict[str, LogLevel] = dict()
+        self.default_level: LogLevel = default_level
+        self.dropped: int = 0
+        self._reported_dropped: int = 0
+
+    def set_level(self, category: str, level: LogLevel | int) -> None:
+        self._levels[category] = LogLevel(level)
+
+    def get_level(self, category: str) -> LogLevel:
+        return self._levels.get(category, self.default_level)
+
+    @property
+    def levels(self) -> dict[str, LogLevel]:
+        """The categories whose level has been set explicitly."""
+        return dict(self._levels)
+
+    def is_enabled(self, category: str, level: LogLevel) -> bool:
+        return level >= self._levels.get(category, self.default_level)
+
+    def log(self, category: str, level: LogLevel, message: str, *args: Any) -> None:
+        if level < self._levels.get(category, self.default_level):
+            return
+        with self._lock:
+            if self._head - self._tail >= self._capacity:
+                self.dropped += 1
+                return
+            slot = self._slots[self._head % self._capacity]
+            slot[0] = time.time()
+            slot[1] = category
+            slot[2] = level
+            slot[3] = message
+            slot[4] = args
+            self._head += 1
+        if self._writer is None:
+            self._start_writer()
+        self._pending.set()
+
+    def debug(self, category: str, message: str, *args: Any) -> None:
+        self.log(category, LogLevel.DEBUG, message, *args)
+
+    def info(self, category: str, message: str, *args: Any) -> None:
+        self.log(category, LogLevel.INFO, message, *args)
+
+    def warning(self, category: str, message: str, *args: Any) -> None:
+        self.log(category, LogLevel.WARNING, message, *args)
+
+    def error(self, category: str, message: str, *args: Any) -> None:
+        self.log(category, LogLevel.ERROR, message, *args)
+
+    def flush(self) -> None:
+        """Writes all buffered records from the calling thread."""
+        self._write_pending()
+
+    def _start_writer(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _write_loop(self) -> None:
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                records = [tuple(self._slots[index % self._capacity]) for index in range(self._tail, self._head)]
+                self._tail = self._head
+                dropped = self.dropped
+            for timestamp, category, level, message, args in records:
+                try:
+                    print(message.format(*args) if args else message)
+                except Exception as err:  # a broken record must not kill the writer
+                    print(f"[log] Unable to format {message!r} with {args!r}: {err}")
+            if dropped > self._reported_dropped:
+                print(f"[log] Dropped {dropped - self._reported_dropped} records because the log buffer was full")
+                self._reported_dropped = dropped
+
+
+log: RingBufferLogger = RingBufferLogger()
@@ -0,0 +1,119 @@
+import json
+import os
+from typing import Any, Iterator
+from controlpanel.shared.base import Device
+from controlpanel.api.dummy.esp32 import ESP32
+from controlpanel.api.dummy import Fixture
+
+
+class NodeRegistry:
+    """The known ESP32 nodes, indexed by name, MAC address, IP address and the universes of their fixtures.
+
+    Names, MAC and IP addresses must be changed through update(), which keeps the indexes consistent.
+    If two nodes claim the same name or address, the one that claimed it last is found.
+    """
+
+    def __init__(self) -> None:
+        self._nodes: list[ESP32] = list()
+        self._by_name: dict[str, ESP32] = dict()
+        self._by_mac: dict[str, ESP32] = dict()
+        self._by_ip: dict[str, ESP32] = dict()
+        self._by_universe: dict[int, ESP32] = dict()
+        self._saved_state: list[dict[str, Any]] | None = None
+
+    def __iter__(self) -> Iterator[ESP32]:
+        return iter(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def add(self, esp: ESP32) -> ESP32:
+        self._nodes.append(esp)
+        self._index(self._by_name, esp.name, esp)
+        self._index(self._by_mac, esp.mac, esp)
+        self._index(self._by_ip, esp.ip, esp)
+        for device in esp.devices.values():
+            self._index_device(esp, device)
+        return esp
+
+    def update(self, esp: ESP32, *, name: str | None = None, mac: str | None = None, ip: str | None = None) -> None:
+        """Changes the given attributes of a registered node. Attributes that are None are left as they are."""
+        if name is not None and name != esp.name:
+            self._unindex(self._by_name, esp.name, esp)
+            esp.name = name
+            self._index(self._by_name, name, esp)
+        if mac is not None and mac != esp.mac:
+            self._unindex(self._by_mac, esp.mac, esp)
+            esp.mac = mac
+            self._index(self._by_mac, mac, esp)
+        if ip is not None and ip != esp.ip:
+            self._unindex(self._by_ip, esp.ip, esp)
+            esp.ip = ip
+            self._index(self._by_ip, ip, esp)
+
+    def add_device(self, esp: ESP32, device: Device) -> None:
+        esp.devices[device.name] = device
+        self._index_device(esp, device)
+
+    def get(self, name: str) -> ESP32 | None:
+        return self._by_name.get(name)
+
+    def get_by_mac(self, mac: str) -> ESP32 | None:
+        return self._by_mac.get(mac)
+
+    def get_by_ip(self, ip: str) -> ESP32 | None:
+        return self._by_ip.get(ip)
+
+    def get_by_universe(self, universe: int) -> ESP32 | None:
+        """Returns the node that owns the fixture with the given universe."""
+        return self._by_universe.get(universe)
+
+    def save(self, path: str) -> bool:
+        """Writes the name, MAC address, IP address and last status of every node to a JSON file,
+        unless nothing has changed since the last save. Returns whether the file was written."""
+        state = [{"name": esp.name, "mac": esp.mac, "ip": esp.ip, "status": esp.status} for esp in self._nodes]
+        if state == self._saved_state:
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(state, file, indent=2)
+        os.replace(temporary_path, path)  # never leave a half-written registry behind
+        self._saved_state = state
+        return True
+
+    def load(self, path: str) -> int:
+        """Registers the nodes saved by save(), so that they can be addressed before they reply to an ArtPoll.
+        Returns the number of nodes loaded. A missing file is not an error."""
+        try:
+            with open(path) as file:
+                state: list[dict[str, Any]] = json.load(file)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as err:
+            print(f"Unable to load the node registry from {path}: {err}")
+            return 0
+        for node in state:
+            esp = self.get(node["name"]) or self.add(ESP32(node["name"]))
+            self.update(esp, mac=node.get("mac"), ip=node.get("ip"))
+            esp.status = node.get("status", esp.status)
+            esp.subsequent_missed_replies = 0
+        self._saved_state = state
+        return len(state)
+
+    def _index_device(self, esp: ESP32, device: Device) -> None:
+        if isinstance(device, Fixture) and device.universe is not None:
+            self._by_universe[device.universe] = esp
+
+    @staticmethod
+    def _index(index: dict[str, ESP32], key: str | None, esp: ESP32) -> None:
+        if key is not None:
+            index[key] = esp
+
+    @staticmethod
+    def _unindex(index: dict[str, ESP32], key: str | None, esp: ESP32) -> None:
+        if key is not None and index.get(key) is esp:
+            del index[key]
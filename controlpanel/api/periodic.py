@@ -0,0 +1,178 @@
+import asyncio
+import inspect
+import time
+from enum import Enum
+from typing import Any, Callable
+from .timer_wheel import Timer, TimerWheel
+from .executors import ScriptExecutors
+from .stats import PeriodicStats
+from .logger import log
+
+
+class OverrunPolicy(Enum):
+    """What a periodic task does about the deadlines it missed, because its previous run or the event loop was late."""
+    SKIP = "skip"  # missed deadlines are dropped, the task keeps to its original schedule
+    CATCH_UP = "catch_up"  # missed runs are made up back to back (at most MAX_CATCH_UP of them)
+
+
+class PeriodicTask:
+    """Calls a function at a fixed frequency from a TimerWheel on the event loop.
+
+    Deadlines are computed from the start time rather than from the end of the previous run, so the schedule does not
+    drift by the function's runtime. Coroutine functions run as tasks. Synchronous functions run in the thread pool of
+    their script, unless they are declared non-blocking (blocking=False), in which case they run directly on the event
+    loop, until one of their runs takes longer than BLOCKING_THRESHOLD. A task never runs in parallel with itself.
+
+    start(), stop() and set_frequency() may be called from any thread. Calling the task calls the function.
+    """
+    MAX_CATCH_UP: int = 10
+    BLOCKING_THRESHOLD: float = 0.002
+
+    def __init__(self,
+                 func: Callable[[], Any],
+                 frequency: float,
+                 *,
+                 loop: asyncio.AbstractEventLoop,
+                 timers: TimerWheel,
+                 executors: ScriptExecutors,
+                 policy: OverrunPolicy = OverrunPolicy.SKIP,
+                 blocking: bool = True) -> None:
+        if frequency <= 0:
+            raise ValueError("The frequency of a periodic task must be positive")
+        self.func: Callable[[], Any] = func
+        self.policy: OverrunPolicy = policy
+        self.stats: PeriodicStats = PeriodicStats()
+        self._interval: float = 1 / frequency
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._timers: TimerWheel = timers
+        self._executors: ScriptExecutors = executors  # the script's pool is looked up once the script has loaded
+        self._blocking: bool = blocking
+        self._is_coroutine: bool = inspect.iscoroutinefunction(func)
+        self._active: bool = False
+        self._deadline: float = 0.0
+        self._timer: Timer | None = None
+        self._running: asyncio.Future | None = None
+        self._pending_run: bool = False
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.func(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<PeriodicTask {self.name} at {self.frequency:g}Hz{'' if self._active else ' (stopped)'}>"
+
+    @property
+    def name(self) -> str:
+        return f"{self.func.__module__.rsplit('.')[-1]}.{self.func.__name__}"
+
+    @property
+    def frequency(self) -> float:
+        return 1 / self._interval
+
+    @property
+    def is_running(self) -> bool:
+        return self._active
+
+    @property
+    def is_offloaded(self) -> bool:
+        return self._blocking and not self._is_coroutine
+
+    def start(self) -> None:
+        """Starts calling the function, beginning right away. Does nothing if the task is already running."""
+        self._in_loop(self._start)
+
+    def stop(self) -> None:
+        """Stops calling the function. A run that is in progress is not interrupted."""
+        self._in_loop(self._stop)
+
+    def set_frequency(self, frequency: float) -> None:
+        """Changes the frequency, starting with the next deadline."""
+        if frequency <= 0:
+            raise ValueError("The frequency of a periodic task must be positive")
+        self._in_loop(self._set_interval, 1 / frequency)
+
+    def _in_loop(self, func: Callable[..., None], *args: Any) -> None:
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            func(*args)
+        else:
+            self._loop.call_soon_threadsafe(func, *args)
+
+    def _start(self) -> None:
+        if self._active:
+            return
+        self._active = True
+        self._deadline = self._loop.time()
+        self._timer = self._timers.call_at(self._deadline, self._fire)
+
+    def _stop(self) -> None:
+        self._active = False
+        self._pending_run = False
+        if self._timer is not None:
+            self._timers.cancel(self._timer)
+            self._timer = None
+
+    def _set_interval(self, interval: float) -> None:
+        if not self._active:
+            self._interval = interval
+            return
+        self._timers.cancel(self._timer)
+        self._deadline += interval - self._interval
+        self._interval = interval
+        self._timer = self._timers.call_at(self._deadline, self._fire)
+
+    def _fire(self) -> None:
+        now = self._loop.time()
+        self.stats.lateness.add(now - self._deadline)
+        missed = int((now - self._deadline) // self._interval)
+        if self.policy is OverrunPolicy.SKIP:
+            skipped = missed
+        else:
+            skipped = max(0, missed - self.MAX_CATCH_UP)
+        self.stats.skipped += skipped
+        self._deadline += (skipped + 1) * self._interval  # still in the past while catching up
+        self._timer = self._timers.call_at(self._deadline, self._fire)
+
+        if self._running is not None and not self._running.done():
+            if self.policy is OverrunPolicy.CATCH_UP:
+                self._pending_run = True  # run as soon as the current run has finished
+            else:
+                self.stats.skipped += 1
+            return
+        self._run()
+
+    def _run(self) -> None:
+        self.stats.runs += 1
+        if self._is_coroutine:
+            self._running = self._loop.create_task(self.func())
+        elif self._blocking:
+            self._running = self._loop.create_task(self._executors.for_callback(self.func).run(self.func))
+        else:
+            start = time.perf_counter()
+            try:
+                self.func()
+            except Exception as err:
+                self.stats.failed += 1
+                log.error("callbacks", "[PeriodicTask] {} raised {!r}", self.name, err)
+            duration = time.perf_counter() - start
+            if duration > self.BLOCKING_THRESHOLD:
+                self._blocking = True
+                log.warning("callbacks", "[PeriodicTask] {} blocked the event loop for {:.0f}ms "
+                            "and runs in the thread pool of its script from now on", self.name, 1000 * duration)
+            return
+        self._running.add_done_callback(self._finished)
+
+    def _finished(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            self.stats.failed += 1
+            error = future.exception()
+            if isinstance(error, asyncio.TimeoutError):
+                log.warning("callbacks", "[PeriodicTask] {} did not finish within {}s and keeps running in the "
+                            "background", self.name, self._executors.for_callback(self.func).timeout)
+            else:
+                log.error("callbacks", "[PeriodicTask] {} raised {!r}", self.name, error)
+        if self._pending_run and self._active:
+            self._pending_run = False
+            self._run()
@@ -0,0 +1,122 @@
+import threading
+import weakref
+from typing import Any, Callable, Generic, TypeVar
+from controlpanel import api
+from .commons import EventSourceType, EventActionType
+
+
+T = TypeVar("T")
+
+VALUE_CHANGED: EventActionType = "ValueChanged"  # the action of the events fired by Cell.fire_on_change
+
+_UNSET: Any = object()
+_lock = threading.RLock()  # cells are set from the ArtNet thread, script threads and the game loop alike
+
+
+class Cell(Generic[T]):
+    """An observable value, like the state of a device.
+
+    Setting a cell to a different value invalidates the Derived values that depend on it and then calls the observers
+    of the cell and of those Derived values whose value actually changed. Observers are called on the thread that set
+    the cell; fire_on_change() forwards the changes to the event bus and thereby to the game loop instead.
+    """
+
+    def __init__(self, value: T, *, name: str | None = None) -> None:
+        self.name: str | None = name
+        self._value: T = value
+        self._dependents: weakref.WeakSet["Derived"] = weakref.WeakSet()
+        self._observers: list[Callable[[T], None]] = []
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name or ''}={self._value!r}>"
+
+    @property
+    def value(self) -> T:
+        return self._value
+
+    def set(self, value: T) -> None:
+        with _lock:
+            if value == self._value:
+                return
+            self._value = value
+            pending: list[Cell] = [self] if self._observers else []
+            for dependent in self._dependents:
+                dependent._invalidate(pending)
+            notifications = [(cell, cell._observers, cell.value) for cell in pending if cell._settle()]
+        for cell, observers, value in notifications:
+            for observer in observers:
+                observer(value)
+
+    def observe(self, observer: Callable[[T], None]) -> Callable[[], None]:
+        """Calls observer with the new value after every change. Returns a function that stops observing."""
+        with _lock:
+            self._settle()  # a Derived value remembers what its observers have seen, to tell its changes apart
+            self._observers = self._observers + [observer]  # copy-on-write, notifications iterate without the lock
+
+        def unobserve() -> None:
+            with _lock:
+                self._observers = [o for o in self._observers if o is not observer]
+        return unobserve
+
+    def fire_on_change(self,
+                       source: EventSourceType | None = None,
+                       action: EventActionType = VALUE_CHANGED) -> Callable[[], None]:
+        """Fires an event from source (the name of the cell by default) with the new value after every change."""
+        source = source or self.name
+        if not source:
+            raise ValueError("A cell without a name needs a source to fire its changes from")
+        return self.observe(lambda value: api.Services.event_manager.fire_event(source, action, value))
+
+    def _settle(self) -> bool:
+        """Whether a pending notification of this cell is still due."""
+        return True
+
+
+class Derived(Cell[T]):
+    """A value computed by func from the values of its input cells.
+
+    It is only recomputed when one of its inputs has changed since it was last computed, and only when it is read or
+    observed. Derived values can be inputs of other Derived values.
+    Inputs only hold weak references to the values derived from them, so that a Derived value that is no longer used,
+    e.g. that of a game that has been replaced, does not live on with its device cells. Keep a reference to it for as
+    long as it is observed.
+    """
+
+    def __init__(self, func: Callable[..., T], *inputs: Cell, name: str | None = None) -> None:
+        super().__init__(_UNSET, name=name)
+        self.func: Callable[..., T] = func
+        self.recomputations: int = 0
+        self._inputs: tuple[Cell, ...] = inputs
+        self._dirty: bool = True
+        self._notified_value: Any = _UNSET
+        with _lock:
+            for cell in inputs:
+                cell._dependents.add(self)
+
+    @property
+    def value(self) -> T:
+        with _lock:
+            if self._dirty:
+                self._value = self.func(*(cell.value for cell in self._inputs))
+                self._dirty = False
+                self.recomputations += 1
+            return self._value
+
+    def set(self, value: T) -> None:
+        raise TypeError("A derived value cannot be set, set its inputs instead")
+
+    def _invalidate(self, pending: list[Cell]) -> None:
+        if self._dirty:
+            return  # everything that depends on this value has been invalidated already
+        self._dirty = True
+        if self._observers:
+            pending.append(self)
+        for dependent in self._dependents:
+            dependent._invalidate(pending)
+
+    def _settle(self) -> bool:
+        value = self.value
+        if self._notified_value is not _UNSET and value == self._notified_value:
+            return False  # an input changed, but this value did not
+        self._notified_value = value
+        return True
@@ -0,0 +1,67 @@
+from .stats import SequenceStats
+
+
+class SequenceWindow:
+    """Recognizes retransmitted and reordered packets of one sensor by their sequence numbers.
+
+    Nodes number their packets from 1 to 255, wrapping around, and send every packet several times.
+    The window remembers which of the WINDOW_SIZE sequence numbers up to the newest one have been seen. A packet is
+    accepted if it is newer than any seen before; retransmits and packets that were overtaken by a newer one are
+    dropped. After EXPIRY seconds without any packet, e.g. because the node restarted, the window starts over.
+    Sequence number 0 is never dropped.
+    """
+    SEQ_COUNT: int = 255
+    WINDOW_SIZE: int = 64
+    EXPIRY: float = 10.0
+
+    def __init__(self) -> None:
+        self.stats: SequenceStats = SequenceStats()
+        self._newest: int | None = None
+        self._seen: int = 0  # bit i is set if the sequence number i before the newest one has been seen
+        self._span: int = 0  # how many sequence numbers the window has advanced over since it started
+        self._last_timestamp: float = 0.0
+
+    def accept(self, seq: int, timestamp: float) -> bool:
+        """Returns whether the packet with the given sequence number should be handled."""
+        if seq == 0:
+            self.stats.accepted += 1
+            return True
+        expired = timestamp - self._last_timestamp > self.EXPIRY
+        self._last_timestamp = timestamp
+        if self._newest is None or expired:
+            self.stats.resets += self._newest is not None
+            return self._advance(seq, 0)
+
+        distance = (seq - self._newest) % self.SEQ_COUNT
+        if distance == 0:
+            self.stats.duplicates += 1
+            return False
+        if distance < self.SEQ_COUNT // 2:
+            return self._advance(seq, distance)
+
+        age = self.SEQ_COUNT - distance
+        if age >= self.WINDOW_SIZE:  # far behind: the node has most likely restarted counting
+            self.stats.resets += 1
+            return self._advance(seq, 0)
+        bit = 1 << age
+        if self._seen & bit:
+            self.stats.duplicates += 1
+        else:
+            self._seen |= bit
+            self.stats.out_of_order += 1
+            if age <= self._span:
+                self.stats.lost -= 1  # it had been counted as lost when the window skipped over it
+        return False
+
+    def _advance(self, seq: int, distance: int) -> bool:
+        """Makes seq the newest sequence number, distance numbers ahead of the previous one (0 to start over)."""
+        if distance == 0:
+            self._seen = 1
+            self._span = 0
+        else:
+            self.stats.lost += distance - 1
+            self._seen = (self._seen << distance | 1) & ((1 << self.WINDOW_SIZE) - 1)
+            self._span = min(self._span + distance, self.WINDOW_SIZE)
+        self._newest = seq
+        self.stats.accepted += 1
+        return True
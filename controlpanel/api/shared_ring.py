@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import struct
+import sys
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+
+
+Wakeup = tuple[Connection, Connection]  # the read and the write end of the pipe that wakes the consumer
+
+
+class SharedRing:
+    """A single-producer, single-consumer ring buffer of byte messages in shared memory, for passing messages between
+    two processes without copying them through a pipe or taking a lock.
+
+    The header holds three counters: the number of bytes ever written and the number of messages dropped (both only
+    advanced by the producer) and the number of bytes ever read (only advanced by the consumer). A counter is only
+    advanced after the bytes it covers have been written or read, so neither side ever sees a partial message.
+    Every message is prefixed by its length.
+    When the ring is full, put() drops the message and counts it instead of waiting for the consumer, so either
+    process can see how many messages were lost.
+    A consumer that has read everything waits for the read end of a pipe to become readable (see fileno), instead of
+    polling the ring. The producer writes a byte into the pipe only when the consumer had caught up with it.
+    """
+    DEFAULT_CAPACITY: int = 1 << 20
+    _HEADER = struct.Struct("<QQQ")  # bytes written, bytes read, messages dropped
+    _LENGTH = struct.Struct("<I")
+
+    def __init__(self, name: str | None = None, capacity: int = DEFAULT_CAPACITY, wakeup: Wakeup | None = None) -> None:
+        """Creates a new ring, or attaches to the existing ring with the given name, capacity and wakeup pipe."""
+        self._owner: bool = name is None
+        if self._owner:
+            self._shm: SharedMemory = SharedMemory(create=True, size=self._HEADER.size + capacity)
+        else:
+            self._shm = _attach(name, self._HEADER.size + capacity)
+        self._buffer: memoryview = self._shm.buf
+        self._capacity: int = capacity
+        self._wakeup: Wakeup = wakeup if wakeup is not None else multiprocessing.Pipe(duplex=False)
+        for connection in self._wakeup:
+            os.set_blocking(connection.fileno(), False)
+        if self._owner:
+            self._HEADER.pack_into(self._buffer, 0, 0, 0, 0)
+
+    def __len__(self) -> int:
+        """The number of bytes waiting to be read."""
+        written, read, _ = self._HEADER.unpack_from(self._buffer, 0)
+        return written - read
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def dropped(self) -> int:
+        return self._HEADER.unpack_from(self._buffer, 0)[2]
+
+    @property
+    def wakeup(self) -> Wakeup:
+        """The pipe to hand to the process that attaches to the ring."""
+        return self._wakeup
+
+    def fileno(self) -> int:
+        """The file descriptor that becomes readable when there are new messages, e.g. for loop.add_reader."""
+        return self._wakeup[0].fileno()
+
+    def clear_wakeup(self) -> None:
+        """Called by the consumer when woken up, before it reads the messages."""
+        try:
+            while os.read(self.fileno(), 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def put(self, message: bytes) -> bool:
+        """Called by the producer only. Returns whether the message fit into the ring."""
+        written, read, dropped = self._HEADER.unpack_from(self._buffer, 0)
+        size = self._LENGTH.size + len(message)
+        if size > self._capacity - (written - read):
+            struct.pack_into("<Q", self._buffer, 16, dropped + 1)
+            return False
+        self._write(written, self._LENGTH.pack(len(message)))
+        self._write(written + self._LENGTH.size, message)
+        struct.pack_into("<Q", self._buffer, 0, written + size)
+        # Checked after publishing the message, so a consumer that had caught up either sees it or is woken up
+        if struct.unpack_from("<Q", self._buffer, 8)[0] == written:
+            try:
+                os.write(self._wakeup[1].fileno(), b"\0")
+            except BlockingIOError:
+                pass  # the pipe is full of wakeups that the consumer has not cleared yet
+        return True
+
+    def get_all(self) -> list[bytes]:
+        """Called by the consumer only. Returns every message that has been written so far."""
+        written, read, _ = self._HEADER.unpack_from(self._buffer, 0)
+        messages: list[bytes] = []
+        position = read
+        while position < written:
+            length, = self._LENGTH.unpack(self._read(position, self._LENGTH.size))
+            messages.append(self._read(position + self._LENGTH.size, length))
+            position += self._LENGTH.size + length
+        if position != read:
+            struct.pack_into("<Q", self._buffer, 8, position)
+        return messages
+
+    def close(self) -> None:
+        """Detaches from the ring. The process that created it also frees the shared memory."""
+        self._buffer.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        for connection in self._wakeup:
+            connection.close()
+
+    def _write(self, position: int, data: bytes) -> None:
+        offset = position % self._capacity
+        first = min(len(data), self._capacity - offset)
+        start = self._HEADER.size + offset
+        self._buffer[start:start + first] = data[:first]
+        if first < len(data):  # wrap around to the start of the ring
+            self._buffer[self._HEADER.size:self._HEADER.size + len(data) - first] = data[first:]
+
+    def _read(self, position: int, length: int) -> bytes:
+        offset = position % self._capacity
+        first = min(length, self._capacity - offset)
+        start = self._HEADER.size + offset
+        data = bytes(self._buffer[start:start + first])
+        if first < length:
+            data += bytes(self._buffer[self._HEADER.size:self._HEADER.size + length - first])
+        return data
+
+
+def _attach(name: str, size: int) -> SharedMemory:
+    """Attaches to a segment without registering it with the resource tracker, which only the creator may do.
+
+    A spawned process shares the tracker of its parent, so unregistering the segment after attaching would
+    remove the creator's registration too and make its unlink() fail in the tracker.
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, size=size, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return SharedMemory(name, size=size)
+    finally:
+        resource_tracker.register = register
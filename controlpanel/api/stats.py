@@ -0,0 +1,176 @@
+from dataclasses import dataclass, field
+from collections import deque
+
+
+@dataclass
+class DispatchStats:
+    """Keeps track of how the dispatch loop absorbs bursts of events."""
+    batches: int = 0
+    events: int = 0
+    last_batch_size: int = 0
+    max_batch_size: int = 0
+    last_dispatch_time: float = 0.0
+    max_dispatch_time: float = 0.0
+    total_dispatch_time: float = 0.0
+    batch_size_histogram: dict[int, int] = field(default_factory=dict)  # power-of-two bucket -> number of batches
+
+    def record(self, batch_size: int, dispatch_time: float) -> None:
+        self.batches += 1
+        self.events += batch_size
+        self.last_batch_size = batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.last_dispatch_time = dispatch_time
+        self.max_dispatch_time = max(self.max_dispatch_time, dispatch_time)
+        self.total_dispatch_time += dispatch_time
+        bucket = 1 << (batch_size - 1).bit_length()
+        self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.events / self.batches if self.batches else 0.0
+
+    @property
+    def mean_dispatch_time(self) -> float:
+        return self.total_dispatch_time / self.batches if self.batches else 0.0
+
+
+@dataclass
+class QueueStats:
+    """Counts what happened to the events that were put into the event queue."""
+    enqueued: int = 0
+    dequeued: int = 0
+    coalesced: int = 0  # events that replaced a queued event of the same (source, action)
+    dropped: int = 0  # events that were evicted because the queue was full
+    blocked: int = 0  # times a producer had to wait for room in the queue
+    max_depth: int = 0
+
+
+@dataclass
+class LaneStats:
+    """Counts the events that went through one lane of the event queue and how long they waited in it."""
+    enqueued: int = 0
+    dequeued: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+    max_depth: int = 0
+    wait_times: "LatencyHistogram" = field(default_factory=lambda: LatencyHistogram())
+
+
+@dataclass
+class ExecutorStats:
+    """Counts the synchronous callbacks that went through a script's thread pool."""
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    timed_out: int = 0  # callbacks that were still running when their timeout expired
+    queued: int = 0  # callbacks waiting for a free worker
+    running: int = 0
+    max_queued: int = 0
+
+
+@dataclass
+class SubscriberStats:
+    """Profiles the callback of a single subscriber."""
+    SAMPLE_COUNT = 1024  # the percentiles are computed over this many of the most recent executions
+
+    invocations: int = 0
+    skipped: int = 0  # events dropped because the callback was still running (SKIP)
+    deferred: int = 0  # events that waited for the running callback (QUEUE and LATEST)
+    overflowed: int = 0  # events dropped because too many events were waiting already (QUEUE)
+    superseded: int = 0  # waiting events that were replaced by a newer event (LATEST)
+    restarted: int = 0  # running callbacks that were cancelled for a newer event (RESTART)
+    max_pending: int = 0
+    total_queue_time: float = 0.0
+    max_queue_time: float = 0.0
+    total_execution_time: float = 0.0
+    max_execution_time: float = 0.0
+    execution_times: deque[float] = field(default_factory=lambda: deque(maxlen=SubscriberStats.SAMPLE_COUNT))
+
+    def record_start(self, queue_time: float) -> None:
+        self.invocations += 1
+        self.total_queue_time += queue_time
+        self.max_queue_time = max(self.max_queue_time, queue_time)
+
+    def record_execution(self, execution_time: float) -> None:
+        self.total_execution_time += execution_time
+        self.max_execution_time = max(self.max_execution_time, execution_time)
+        self.execution_times.append(execution_time)
+
+    def execution_time_percentile(self, percentile: float) -> float:
+        samples = sorted(self.execution_times)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+    @property
+    def mean_queue_time(self) -> float:
+        return self.total_queue_time / self.invocations if self.invocations else 0.0
+
+
+@dataclass
+class LatencyHistogram:
+    """Counts latencies in power-of-two buckets of 0.1ms, so that percentiles can be estimated in constant memory."""
+    RESOLUTION = 0.0001
+
+    count: int = 0
+    total: float = 0.0
+    maximum: float = 0.0
+    buckets: dict[int, int] = field(default_factory=dict)  # bucket upper bound in units of RESOLUTION -> count
+
+    def add(self, latency: float) -> None:
+        self.count += 1
+        self.total += latency
+        self.maximum = max(self.maximum, latency)
+        bucket = 1 << max(0, int(latency / self.RESOLUTION)).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """Returns the upper bound of the bucket that contains the given percentile."""
+        threshold = self.count * percentile / 100
+        seen = 0
+        for bucket, count in sorted(self.buckets.items()):
+            seen += count
+            if seen >= threshold:
+                return min(bucket * self.RESOLUTION, self.maximum)
+        return self.maximum
+
+
+@dataclass
+class SequenceStats:
+    """Counts what the sequence numbers of a sensor's packets reveal about the network."""
+    accepted: int = 0
+    duplicates: int = 0  # retransmits of packets that have already been handled
+    out_of_order: int = 0  # packets that arrived after a newer one and were dropped as outdated
+    lost: int = 0  # skipped sequence numbers that never arrived (so far)
+    resets: int = 0  # times the window expired or the node restarted counting
+
+    def __iadd__(self, other: "SequenceStats") -> "SequenceStats":
+        self.accepted += other.accepted
+        self.duplicates += other.duplicates
+        self.out_of_order += other.out_of_order
+        self.lost += other.lost
+        self.resets += other.resets
+        return self
+
+
+@dataclass
+class WorkerStats:
+    """Counts the messages exchanged with a script worker process."""
+    forwarded: int = 0  # events put into the worker's event ring
+    dropped: int = 0  # events that did not fit into the worker's event ring
+    unpicklable: int = 0  # events whose value could not be sent to the worker
+    returned_events: int = 0  # events fired by the worker
+    returned_commands: int = 0  # ArtNet commands sent by the worker's devices
+
+
+@dataclass
+class PeriodicStats:
+    """Counts the runs of a periodic task and how late they started."""
+    runs: int = 0
+    skipped: int = 0  # deadlines that were dropped because the task overran them
+    failed: int = 0
+    lateness: LatencyHistogram = field(default_factory=LatencyHistogram)
@@ -0,0 +1,425 @@
+import re
+from bisect import bisect_left
+from itertools import count
+from fnmatch import translate
+from typing import Any, Callable, Iterable
+from .commons import Condition, Subscriber, EventSourceType, EventActionType, EventValueType, ValueRange
+
+
+# Stamps every change of a lazily snapshotted structure. A snapshot is only used while it carries the current stamp, so
+# one that the event loop built while another thread changed the structure is rebuilt instead of kept for good.
+# next() on a count is atomic, so two threads never get the same stamp.
+_versions = count(1)
+
+
+def _is_number(value: Any) -> bool:
+    return type(value) is int or type(value) is float
+
+
+def compile_pattern(name: Any) -> re.Pattern | None:
+    """Returns the compiled pattern if the given source or action name is a glob (like "Voltmeter*") or a regex."""
+    if isinstance(name, re.Pattern):
+        return name
+    if isinstance(name, str) and any(char in name for char in "*?["):
+        return re.compile(translate(name))
+    return None
+
+
+class SubscriberList:
+    """An insertion-ordered set of subscribers that can be added and removed in constant time.
+
+    Readers iterate an immutable snapshot, which is only rebuilt on the first read after a change. Dispatch can
+    therefore go through the subscribers without a lock while callbacks add or remove subscriptions.
+    """
+    __slots__ = ("_subscribers", "_version", "_snapshot")
+
+    def __init__(self) -> None:
+        self._subscribers: dict[int, Subscriber] = dict()  # id(subscriber) -> subscriber
+        self._version: int = 0
+        self._snapshot: tuple[int, tuple[Subscriber, ...]] = (0, ())  # the version it was built from, the snapshot
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def __iter__(self):
+        return iter(self.snapshot)
+
+    @property
+    def snapshot(self) -> tuple[Subscriber, ...]:
+        version, snapshot = self._snapshot
+        if version != self._version:
+            version = self._version  # read before the subscribers, so a change made meanwhile invalidates the snapshot
+            snapshot = tuple(self._subscribers.values())
+            self._snapshot = (version, snapshot)
+        return snapshot
+
+    def add(self, subscriber: Subscriber) -> None:
+        self._subscribers[id(subscriber)] = subscriber
+        self._version = next(_versions)
+
+    def remove(self, subscriber: Subscriber) -> bool:
+        if self._subscribers.pop(id(subscriber), None) is None:
+            return False
+        self._version = next(_versions)
+        return True
+
+
+class Subscription:
+    """The handle returned by subscribe, which can remove the subscription again."""
+    __slots__ = ("subscriber", "_index")
+
+    def __init__(self, subscriber: Subscriber, index: "SubscriptionIndex") -> None:
+        self.subscriber: Subscriber = subscriber
+        self._index: SubscriptionIndex = index
+
+    def __repr__(self) -> str:
+        return f"<Subscription {self.subscriber.name} {self.subscriber.condition}{'' if self.active else ' (removed)'}>"
+
+    @property
+    def active(self) -> bool:
+        return self.subscriber.active
+
+    def unsubscribe(self) -> bool:
+        """Removes the subscription. Returns False if it had already been removed."""
+        return self._index.remove(self.subscriber.condition, self.subscriber)
+
+
+class PatternSubscription:
+    """A subscription whose source and/or action is a pattern.
+
+    It is materialized into ordinary conditions for every matching source and action the index learns about,
+    so that dispatching to it costs the same as dispatching to an exact subscription.
+    """
+
+    def __init__(self, condition: Condition, subscriber: Subscriber,
+                 source_pattern: re.Pattern | None, action_pattern: re.Pattern | None) -> None:
+        self.condition: Condition = condition
+        self.subscriber: Subscriber = subscriber
+        self.source_pattern: re.Pattern | None = source_pattern
+        self.action_pattern: re.Pattern | None = action_pattern
+        self.materialized: dict[tuple[EventSourceType | None, EventActionType | None], Condition] = dict()
+
+    def materialize(self, source: EventSourceType | None, action: EventActionType | None) -> Condition | None:
+        """Returns the new condition this subscription needs for the given names, if any."""
+        if self.source_pattern is not None:
+            if source is None or not self.source_pattern.fullmatch(source):
+                return None
+        else:
+            source = self.condition.source
+        if self.action_pattern is not None:
+            if action is None or not self.action_pattern.fullmatch(action):
+                return None
+        else:
+            action = self.condition.action
+        if (source, action) in self.materialized:
+            return None
+        condition = Condition(source, action, self.condition.value)
+        self.materialized[(source, action)] = condition
+        return condition
+
+
+class IntervalIndex:
+    """Finds the subscribers whose ValueRange (or range) contains a number in logarithmic time.
+
+    The bounds of all intervals split the number line into points and the open segments between them.
+    Every such region stores the subscribers of all intervals that cover it, so a lookup is a single bisection.
+    The regions are rebuilt lazily on the first lookup after a change.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[int, tuple[ValueRange | range, Subscriber]] = dict()  # id(subscriber) -> entry
+        self._version: int = 0
+        # The version the lookup was built from, the bounds and the regions between them, replaced all at once
+        self._lookup: tuple[int, list[float], list[tuple[tuple[ValueRange | range, Subscriber], ...]]] = (0, [], [()])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries.values()))
+
+    def add(self, interval: ValueRange | range, subscriber: Subscriber) -> None:
+        self._entries[id(subscriber)] = (interval, subscriber)
+        self._version = next(_versions)
+
+    def remove(self, interval: ValueRange | range, subscriber: Subscriber) -> bool:
+        if self._entries.pop(id(subscriber), None) is None:
+            return False
+        self._version = next(_versions)
+        return True
+
+    def find(self, value: float) -> list[Subscriber]:
+        version, bounds, regions = self._lookup
+        if version != self._version:
+            version, bounds, regions = self._rebuild()
+        i = bisect_left(bounds, value)
+        region = 2 * i + 1 if i < len(bounds) and bounds[i] == value else 2 * i
+        # ranges with a step only cover some of the numbers between their bounds
+        return [subscriber for interval, subscriber in regions[region]
+                if type(interval) is not range or value in interval]
+
+    @staticmethod
+    def _as_bounds(interval: ValueRange | range) -> tuple[float | None, float | None, bool, bool]:
+        if isinstance(interval, ValueRange):
+            return interval.minimum, interval.maximum, interval.include_minimum, interval.include_maximum
+        return min(interval[0], interval[-1]), max(interval[0], interval[-1]), True, True
+
+    def _rebuild(self) -> tuple[int, list[float], list[tuple[tuple[ValueRange | range, Subscriber], ...]]]:
+        # Region 2i is the open segment below bound i, region 2i+1 is bound i itself
+        version = self._version
+        entries = [entry for entry in tuple(self._entries.values())
+                   if not isinstance(entry[0], range) or len(entry[0]) > 0]
+        unique_bounds: set[float] = set()
+        for interval, _ in entries:
+            minimum, maximum, _, _ = self._as_bounds(interval)
+            unique_bounds.update(bound for bound in (minimum, maximum) if bound is not None)
+        bounds = sorted(unique_bounds)
+        regions: list[list[tuple[ValueRange | range, Subscriber]]] = [[] for _ in range(2 * len(bounds) + 1)]
+        for entry in entries:
+            minimum, maximum, include_minimum, include_maximum = self._as_bounds(entry[0])
+            if minimum is None:
+                first = 0
+            else:
+                i = bisect_left(bounds, minimum)
+                first = 2 * i + 1 if include_minimum else 2 * i + 2
+            if maximum is None:
+                last = len(regions) - 1
+            else:
+                i = bisect_left(bounds, maximum)
+                last = 2 * i + 1 if include_maximum else 2 * i
+            for region in range(first, last + 1):
+                regions[region].append(entry)
+        lookup = self._lookup = (version, bounds, [tuple(region) for region in regions])
+        return lookup
+
+
+class ValueTable:
+    """The subscribers of one (source, action) branch, indexed by the value they are interested in.
+
+    Exact values and the members of sets are looked up in a dict, ranges in an IntervalIndex.
+    Callables are evaluated one by one, so they are the most expensive kind of condition.
+    Every kind of condition can be removed in constant time (per member of a set).
+    """
+
+    def __init__(self) -> None:
+        self._exact: dict[EventValueType, SubscriberList] = dict()
+        self._intervals: IntervalIndex = IntervalIndex()
+        self._predicates: dict[int, tuple[Callable[[Any], bool], Subscriber]] = dict()  # id(subscriber) -> entry
+        self._predicate_version: int = 0
+        self._predicate_snapshot: tuple[int, tuple[tuple[Callable[[Any], bool], Subscriber], ...]] = (0, ())
+
+    def add(self, value: Any, subscriber: Subscriber) -> None:
+        if isinstance(value, (ValueRange, range)):
+            self._intervals.add(value, subscriber)
+        elif isinstance(value, frozenset):
+            for member in value:
+                self._add_exact(member, subscriber)
+        elif callable(value):
+            self._predicates[id(subscriber)] = (value, subscriber)
+            self._predicate_version = next(_versions)
+        else:
+            self._add_exact(value, subscriber)
+
+    def remove(self, value: Any, subscriber: Subscriber) -> bool:
+        if isinstance(value, (ValueRange, range)):
+            return self._intervals.remove(value, subscriber)
+        elif isinstance(value, frozenset):
+            return all([self._remove_exact(member, subscriber) for member in value])
+        elif callable(value):
+            if self._predicates.pop(id(subscriber), None) is None:
+                return False
+            self._predicate_version = next(_versions)
+            return True
+        return self._remove_exact(value, subscriber)
+
+    def __iter__(self):
+        for subscribers in list(self._exact.values()):
+            yield from subscribers
+        for _, subscriber in self._intervals:
+            yield subscriber
+        for _, subscriber in self._predicate_list():
+            yield subscriber
+
+    def _predicate_list(self) -> tuple[tuple[Callable[[Any], bool], Subscriber], ...]:
+        version, predicates = self._predicate_snapshot
+        if version != self._predicate_version:
+            version = self._predicate_version
+            predicates = tuple(self._predicates.values())
+            self._predicate_snapshot = (version, predicates)
+        return predicates
+
+    def _add_exact(self, value: EventValueType, subscriber: Subscriber) -> None:
+        subscribers = self._exact.get(value)
+        if subscribers is None:
+            subscribers = self._exact[value] = SubscriberList()
+        subscribers.add(subscriber)
+
+    def _remove_exact(self, value: EventValueType, subscriber: Subscriber) -> bool:
+        subscribers = self._exact.get(value)
+        if subscribers is None or not subscribers.remove(subscriber):
+            return False
+        if not subscribers:
+            del self._exact[value]  # per-round subscriptions to ever new values must not accumulate empty lists
+        return True
+
+    def match(self, value: EventValueType, subscribers: list[Subscriber]) -> None:
+        """Appends the subscribers that match the given value to subscribers, wildcards last."""
+        if value is not None:
+            try:
+                matched = self._exact.get(value)
+            except TypeError:  # unhashable values can only match predicates and wildcard conditions
+                matched = None
+            if matched:
+                subscribers += matched.snapshot
+            if self._intervals and _is_number(value):
+                subscribers += self._intervals.find(value)
+            for predicate, subscriber in self._predicate_list():
+                try:
+                    if predicate(value):
+                        subscribers.append(subscriber)
+                except Exception:  # a predicate that cannot handle the value does not match it
+                    pass
+        matched = self._exact.get(None)
+        if matched:
+            subscribers += matched.snapshot
+
+
+class SubscriptionIndex:
+    """Resolves the subscribers of an event without probing every wildcard combination.
+
+    Subscribers are stored in a trie keyed by source, then action, then value, with None acting as the wildcard
+    on every level. For each (source, action) pair that gets dispatched, the index caches a plan: the value tables
+    of all matching branches, in order of precedence. Since plans reference the tables themselves, adding a
+    subscriber to an existing branch needs no invalidation. Only a new (source, action) branch invalidates the plans,
+    by stamping the tree with a new version.
+
+    Subscriptions with source or action patterns are kept in a separate table and materialized against every
+    source and action the index knows about: those registered up front with register_names and those of every
+    event that is dispatched for the first time.
+    """
+
+    def __init__(self) -> None:
+        self._tree: dict[EventSourceType | None, dict[EventActionType | None, ValueTable]] = dict()
+        self._tree_version: int = 0
+        # (source, action) -> the version of the tree the plan was built from, the plan
+        self._plans: dict[tuple[EventSourceType, EventActionType], tuple[int, tuple[ValueTable, ...]]] = dict()
+        self._patterns: dict[int, PatternSubscription] = dict()  # id(subscriber) -> pattern subscription
+        self._known_sources: set[EventSourceType] = set()
+        self._known_actions: set[EventActionType] = set()
+        self._known_pairs: set[tuple[EventSourceType, EventActionType]] = set()
+        self._size: int = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, condition: Condition, subscriber: Subscriber) -> None:
+        source_pattern = compile_pattern(condition.source)
+        action_pattern = compile_pattern(condition.action)
+        if source_pattern is None and action_pattern is None:
+            self._add(condition, subscriber)
+        else:
+            pattern = PatternSubscription(condition, subscriber, source_pattern, action_pattern)
+            self._patterns[id(subscriber)] = pattern
+            # The names are copied, as the event loop keeps learning new ones while scripts subscribe
+            if source_pattern is not None and action_pattern is not None:
+                names = tuple(self._known_pairs)
+            elif source_pattern is not None:
+                names = tuple((source, None) for source in tuple(self._known_sources))
+            else:
+                names = tuple((None, action) for action in tuple(self._known_actions))
+            for source, action in names:
+                self._materialize(pattern, source, action)
+        self._size += 1
+
+    def register_names(self, pairs: Iterable[tuple[EventSourceType, EventActionType | None]]) -> None:
+        """Makes the given sources and actions known, so that pattern subscriptions are resolved against them
+        right away instead of on their first event."""
+        for source, action in pairs:
+            self._learn(source, action)
+
+    def _learn(self, source: EventSourceType, action: EventActionType | None) -> None:
+        new_source = source is not None and source not in self._known_sources
+        new_action = action is not None and action not in self._known_actions
+        new_pair = source is not None and action is not None and (source, action) not in self._known_pairs
+        if new_source:
+            self._known_sources.add(source)
+        if new_action:
+            self._known_actions.add(action)
+        if new_pair:
+            self._known_pairs.add((source, action))
+        if not self._patterns or not (new_source or new_action or new_pair):
+            return
+        for pattern in tuple(self._patterns.values()):  # may be unsubscribed from another thread meanwhile
+            if pattern.source_pattern is not None and pattern.action_pattern is not None:
+                if new_pair:
+                    self._materialize(pattern, source, action)
+            elif pattern.source_pattern is not None:
+                if new_source:
+                    self._materialize(pattern, source, None)
+            elif new_action:
+                self._materialize(pattern, None, action)
+
+    def _materialize(self, pattern: PatternSubscription,
+                     source: EventSourceType | None, action: EventActionType | None) -> None:
+        condition = pattern.materialize(source, action)
+        if condition is not None:
+            self._add(condition, pattern.subscriber)
+
+    def _add(self, condition: Condition, subscriber: Subscriber) -> None:
+        actions = self._tree.setdefault(condition.source, dict())
+        table = actions.get(condition.action)
+        if table is None:
+            table = actions[condition.action] = ValueTable()
+            self._tree_version = next(_versions)  # a new branch may be part of any cached plan
+        table.add(condition.value, subscriber)
+
+    def remove(self, condition: Condition, subscriber: Subscriber) -> bool:
+        pattern = self._patterns.get(id(subscriber))
+        if pattern is not None and pattern.condition == condition:
+            del self._patterns[id(subscriber)]
+            for materialized in pattern.materialized.values():
+                self._remove(materialized, subscriber)
+        elif not self._remove(condition, subscriber):
+            return False
+        subscriber.active = False
+        self._size -= 1
+        return True
+
+    def _remove(self, condition: Condition, subscriber: Subscriber) -> bool:
+        table = self._tree.get(condition.source, {}).get(condition.action)
+        return table is not None and table.remove(condition.value, subscriber)
+
+    def subscribers(self) -> list[Subscriber]:
+        """Returns every subscriber in the index once."""
+        unique: dict[int, Subscriber] = {id(pattern.subscriber): pattern.subscriber for pattern in self._patterns.values()}
+        for actions in self._tree.values():
+            for table in actions.values():
+                for subscriber in table:
+                    unique.setdefault(id(subscriber), subscriber)
+        return list(unique.values())
+
+    def resolve(self, source: EventSourceType, action: EventActionType, value: EventValueType) -> tuple[Subscriber, ...]:
+        """Returns all subscribers whose condition matches the event, most specific conditions first.
+        The result is a snapshot: subscriptions added or removed afterwards do not change it."""
+        entry = self._plans.get((source, action))
+        plan = entry[1] if entry is not None and entry[0] == self._tree_version else self._build_plan(source, action)
+        subscribers: list[Subscriber] = []
+        for table in plan:
+            table.match(value, subscribers)
+        return tuple(subscribers)
+
+    def _build_plan(self, source: EventSourceType, action: EventActionType) -> tuple[ValueTable, ...]:
+        self._learn(source, action)
+        version = self._tree_version
+        tables: list[ValueTable] = []
+        for source_key in (source, None) if source is not None else (None,):
+            actions = self._tree.get(source_key)
+            if actions is None:
+                continue
+            for action_key in (action, None) if action is not None else (None,):
+                table = actions.get(action_key)
+                if table is not None:
+                    tables.append(table)
+        plan = tuple(tables)
+        self._plans[(source, action)] = (version, plan)
+        return plan
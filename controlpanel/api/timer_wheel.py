@@ -0,0 +1,123 @@
+import asyncio
+import math
+from typing import Callable
+
+
+class Timer:
+    """A callback that a TimerWheel calls once its deadline (in event loop time) has passed."""
+    __slots__ = ("deadline", "callback", "cancelled")
+
+    def __init__(self, deadline: float, callback: Callable[[], None]) -> None:
+        self.deadline: float = deadline
+        self.callback: Callable[[], None] = callback
+        self.cancelled: bool = False
+
+
+class TimerWheel:
+    """A hierarchical timer wheel that runs any number of timers on an event loop with a single loop timer.
+
+    Time is divided into ticks of TICK seconds. Level 0 has one slot per tick for the next SLOTS ticks, every further
+    level has slots SLOTS times as wide. A timer is put into the finest level whose range covers its deadline, and
+    whenever level 0 has gone around once, the next slot of level 1 is cascaded into the finer levels (and so on).
+    Adding and cancelling a timer is therefore constant time, no matter how many timers there are.
+
+    The wheel only wakes up for slots that hold timers and for cascades, not for every tick. Timers never fire early,
+    and at most one TICK late plus the latency of the event loop. It must only be used from the event loop's thread.
+    """
+    TICK: float = 0.001
+    SLOT_BITS: int = 8
+    SLOTS: int = 1 << SLOT_BITS
+    LEVELS: int = 4  # covers 2**32 ticks, about 50 days; later deadlines are clamped to the last level
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._levels: list[list[list[Timer]]] = [[[] for _ in range(self.SLOTS)] for _ in range(self.LEVELS)]
+        self._tick: int = int(loop.time() / self.TICK)  # the next tick to process
+        self._count: int = 0
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._wakeup_tick: int | None = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def call_at(self, deadline: float, callback: Callable[[], None]) -> Timer:
+        if not self._count:
+            # Nothing is pending, so the wheel can skip the ticks it has been idle for instead of walking through them
+            self._tick = max(self._tick, int(self._loop.time() / self.TICK))
+        timer = Timer(deadline, callback)
+        self._place(timer, math.ceil(deadline / self.TICK))
+        self._count += 1
+        self._schedule_wakeup()
+        return timer
+
+    def cancel(self, timer: Timer) -> None:
+        """The timer is removed from its slot lazily, when the slot comes up."""
+        if not timer.cancelled:
+            timer.cancelled = True
+            self._count -= 1
+
+    def _place(self, timer: Timer, tick: int) -> None:
+        tick = max(tick, self._tick)
+        delta = tick - self._tick
+        for level in range(self.LEVELS):
+            if delta < 1 << (self.SLOT_BITS * (level + 1)) or level == self.LEVELS - 1:
+                slot = (tick >> (self.SLOT_BITS * level)) & (self.SLOTS - 1)
+                self._levels[level][slot].append(timer)
+                return
+
+    def _cascade(self) -> None:
+        """Moves the timers of the coarser slots that begin at the current tick into the finer levels."""
+        for level in range(1, self.LEVELS):
+            slot = (self._tick >> (self.SLOT_BITS * level)) & (self.SLOTS - 1)
+            timers = self._levels[level][slot]
+            if timers:
+                self._levels[level][slot] = []
+                for timer in timers:
+                    if not timer.cancelled:
+                        self._place(timer, math.ceil(timer.deadline / self.TICK))
+            if slot != 0:
+                break  # the next level only cascades when this one has gone around as well
+
+    def _next_tick(self) -> int:
+        """The next tick that has timers in level 0 or that requires a cascade."""
+        level_0 = self._levels[0]
+        boundary = (self._tick + self.SLOTS - 1) & ~(self.SLOTS - 1)  # the next cascade, maybe the current tick
+        for tick in range(self._tick, boundary):
+            if level_0[tick & (self.SLOTS - 1)]:
+                return tick
+        return boundary
+
+    def _run(self) -> None:
+        self._wakeup = None
+        self._wakeup_tick = None
+        now_tick = int(self._loop.time() / self.TICK)
+        while self._count:
+            tick = self._next_tick()
+            if tick > now_tick:
+                self._tick = now_tick + 1  # no timers and no cascade in between
+                break
+            self._tick = tick
+            if tick & (self.SLOTS - 1) == 0:
+                self._cascade()
+            slot = tick & (self.SLOTS - 1)
+            timers = self._levels[0][slot]
+            self._levels[0][slot] = []
+            self._tick = tick + 1  # timers added by the callbacks below go into the next tick at the earliest
+            for timer in timers:
+                if timer.cancelled:
+                    continue
+                timer.cancelled = True  # it has fired
+                self._count -= 1
+                timer.callback()
+        self._schedule_wakeup()
+
+    def _schedule_wakeup(self) -> None:
+        if not self._count:
+            return
+        tick = self._next_tick()
+        if self._wakeup is not None:
+            if self._wakeup_tick <= tick:
+                return
+            self._wakeup.cancel()
+        self._wakeup = self._loop.call_at(tick * self.TICK, self._run)
+        self._wakeup_tick = tick
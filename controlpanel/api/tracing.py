@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any
+from .stats import LatencyHistogram
+
+
+class EventTrace:
+    """Monotonic timestamps (time.perf_counter) of one event on its way from the network to the fixtures.
+
+    An event that is fired while another event is being handled (e.g. by a callback) inherits the receive
+    timestamps and the origin of that event, so latencies are always measured from the original sensor packet.
+    """
+    __slots__ = ("tracer", "origin", "source", "action", "received", "parsed", "enqueued", "dispatched")
+
+    def __init__(self, tracer: "Tracer", origin: str | None, received: float | None, parsed: float | None) -> None:
+        self.tracer: Tracer = tracer
+        self.origin: str | None = origin
+        self.source: str | None = None
+        self.action: str | None = None
+        self.received: float | None = received
+        self.parsed: float | None = parsed
+        self.enqueued: float | None = None
+        self.dispatched: float | None = None
+
+    @property
+    def start(self) -> float | None:
+        return self.received if self.received is not None else self.enqueued
+
+    def record_output(self, fixture_name: str) -> None:
+        """Called by a fixture that sends DMX data as a consequence of this event."""
+        self.tracer.record_output(self, fixture_name)
+
+
+# The trace of the packet or event that is currently being handled in this thread or task
+current_trace: ContextVar[EventTrace | None] = ContextVar("current_trace", default=None)
+
+
+class Tracer:
+    """Collects EventTraces into per-device-pair latency histograms and a bounded buffer of Chrome trace events.
+
+    Tracing is disabled by default. The recorded trace events can be loaded in chrome://tracing or Perfetto.
+    """
+    MAX_TRACE_EVENTS: int = 100_000
+    NETWORK_LANE: int = 1
+    QUEUE_LANE: int = 2
+    OUTPUT_LANE: int = 3
+
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.latencies: dict[tuple[str, str], LatencyHistogram] = dict()  # (sensor, fixture) -> histogram
+        self._trace_events: deque[dict[str, Any]] = deque(maxlen=self.MAX_TRACE_EVENTS)
+        self._epoch: float = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def begin_packet(self, received: float) -> EventTrace:
+        return EventTrace(self, None, received, None)
+
+    def begin_event(self, source: str, action: str) -> EventTrace:
+        """Creates the trace of an event that is about to be queued."""
+        parent = current_trace.get()
+        if parent is not None:
+            trace = EventTrace(self, parent.origin or source, parent.received, parent.parsed)
+        else:
+            trace = EventTrace(self, source, None, None)
+        trace.source = source
+        trace.action = action
+        trace.enqueued = time.perf_counter()
+        return trace
+
+    def record_dispatch(self, trace: EventTrace) -> None:
+        trace.dispatched = time.perf_counter()
+        name = f"{trace.source} -> {trace.action}"
+        if trace.received is not None and trace.parsed is not None:
+            self._add_span("receive " + name, "network", trace.received, trace.parsed, self.NETWORK_LANE)
+        self._add_span("queue " + name, "queue", trace.enqueued, trace.dispatched, self.QUEUE_LANE)
+
+    def record_callback(self, trace: EventTrace, callback_name: str, start: float, end: float) -> None:
+        self._add_span(callback_name, "callback", start, end, threading.get_ident(),
+                       args={"source": trace.source, "action": trace.action})
+
+    def record_output(self, trace: EventTrace, fixture_name: str) -> None:
+        now = time.perf_counter()
+        key = (trace.origin, fixture_name)
+        with self._lock:
+            histogram = self.latencies.get(key)
+            if histogram is None:
+                histogram = self.latencies[key] = LatencyHistogram()
+            histogram.add(now - trace.start)
+        self._add_instant(f"{fixture_name} <- {trace.origin}", "output", now, self.OUTPUT_LANE)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latencies.clear()
+            self._trace_events.clear()
+
+    def export_chrome_trace(self, filename: str) -> int:
+        """Writes the recorded trace events as Chrome trace-event JSON. Returns the number of events written."""
+        with self._lock:
+            trace_events = list(self._trace_events)
+        with open(filename, "w") as file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
+        return len(trace_events)
+
+    def _timestamp_us(self, timestamp: float) -> float:
+        return (timestamp - self._epoch) * 1e6
+
+    def _add_span(self, name: str, category: str, start: float, end: float, lane: int,
+                  args: dict[str, Any] | None = None) -> None:
+        event = {"name": name, "cat": category, "ph": "X", "pid": 1, "tid": lane,
+                 "ts": self._timestamp_us(start), "dur": (end - start) * 1e6}
+        if args:
+            event["args"] = args
+        self._trace_events.append(event)
+
+    def _add_instant(self, name: str, category: str, timestamp: float, lane: int) -> None:
+        self._trace_events.append({"name": name, "cat": category, "ph": "i", "s": "t", "pid": 1, "tid": lane,
+                                   "ts": self._timestamp_us(timestamp)})
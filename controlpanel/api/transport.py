@@ -0,0 +1,68 @@
+import asyncio
+import socket
+import struct
+from typing import Any, Callable
+from controlpanel.upy.artnet.artnet import ART_NET_PORT
+from controlpanel.upy.artnet.helper import ARTNET_REPLY_PARSER, OpCode, parse_header
+
+
+ArtNetCallback = Callable[[OpCode, str, int, dict[str, Any]], None]
+# Gets the raw datagram first and returns True if it has handled it, so that it is not parsed into a reply
+FastPathCallback = Callable[[bytes, str, int], bool]
+
+
+class ArtNetProtocol(asyncio.DatagramProtocol):
+    """Receives ArtNet packets directly on the event loop and hands the parsed replies to a callback,
+    the same way ArtNet.listen does on its own thread."""
+
+    def __init__(self, callback: ArtNetCallback, fast_path: FastPathCallback | None = None) -> None:
+        self._callback: ArtNetCallback = callback
+        self._fast_path: FastPathCallback | None = fast_path
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        if self._fast_path is not None and self._fast_path(data, addr[0], addr[1]):
+            return
+        op_code = parse_header(data)
+        if op_code is None:
+            return
+        parser = ARTNET_REPLY_PARSER.get(op_code)
+        if parser is None:
+            return
+        try:
+            reply = parser(data)
+        except (ValueError, IndexError, struct.error):  # a truncated or garbled packet, or text that is not UTF-8
+            return
+        if reply is None:
+            return
+        self._callback(op_code, addr[0], addr[1], reply)
+
+    def error_received(self, exc: Exception) -> None:
+        print(f"[ArtNetProtocol] Socket error: {exc}")
+
+
+def create_artnet_socket(port: int = ART_NET_PORT) -> socket.socket:
+    """Creates a non-blocking UDP socket that receives the ArtNet packets on the given port.
+
+    It must be the only socket bound to the port, as unicast datagrams are delivered to one of them only.
+    Hence SO_REUSEPORT is not set: if another socket, like one of the ArtNet instance, holds the port already,
+    binding fails and the caller falls back to the listen thread of the ArtNet instance."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    sock.bind(("", port))
+    sock.setblocking(False)
+    return sock
+
+
+async def open_artnet_endpoint(callback: ArtNetCallback,
+                               port: int = ART_NET_PORT,
+                               fast_path: FastPathCallback | None = None,
+                               ) -> tuple[asyncio.DatagramTransport, ArtNetProtocol]:
+    """Starts receiving ArtNet packets on the running event loop. Close the returned transport to stop."""
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(lambda: ArtNetProtocol(callback, fast_path),
+                                               sock=create_artnet_socket(port))
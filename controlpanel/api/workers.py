@@ -0,0 +1,260 @@
+import asyncio
+import atexit
+import contextlib
+import multiprocessing
+import pickle
+import threading
+import time
+from types import ModuleType
+from typing import Any, Callable, Iterable
+from .commons import Event, EventTemplate, intern_key, EventSourceType, EventActionType, EventValueType
+from .event_manager import EventManager
+from .event_queue import EventLane
+from .shared_ring import SharedRing, Wakeup
+from .services import Services
+from .stats import WorkerStats
+from .logger import log
+
+
+WORKER_PREFIX = "worker:"  # load_scripts entries with this prefix are loaded into a worker process
+
+
+class ScriptWorker:
+    """Runs a script in a process of its own, so that its callbacks do not compete for the GIL with packet parsing and
+    rendering.
+
+    The main process copies every dispatched event into the worker's event ring. The worker dispatches them to the
+    script's subscribers and writes the events it fires and the ArtNet packets its devices send into a return ring,
+    which the main process drains on its event loop. Event values have to be picklable to reach the worker.
+    Neither side polls its ring: both wait on the ring's wakeup pipe with loop.add_reader.
+    """
+
+    def __init__(self, script_name: str, capacity: int = SharedRing.DEFAULT_CAPACITY) -> None:
+        self.name: str = script_name
+        self._events: SharedRing = SharedRing(capacity=capacity)
+        self._returns: SharedRing = SharedRing(capacity=capacity)
+        # Forking a process with running threads is unsafe, so the worker starts from a fresh interpreter
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=run_worker,
+            args=(script_name, self._events.name, self._returns.name, capacity, self._events.wakeup,
+                  self._returns.wakeup),
+            name=f"worker-{script_name}",
+            daemon=True,
+        )
+        self.stats: WorkerStats = WorkerStats()
+
+    @property
+    def pid(self) -> int | None:
+        return self._process.pid
+
+    @property
+    def is_alive(self) -> bool:
+        return self._process.is_alive()
+
+    @property
+    def return_ring_dropped(self) -> int:
+        """The number of messages the worker could not send because the return ring was full."""
+        return self._returns.dropped
+
+    def start(self) -> None:
+        self._process.start()
+        atexit.register(self.close)
+
+    def put(self, event: Event) -> None:
+        """Forwards a dispatched event to the worker. Called by the dispatch loop only."""
+        try:
+            message = pickle.dumps((event.source, event.action, event.value, event.sender, event.timestamp),
+                                   pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            self.stats.unpicklable += 1
+            return
+        if self._events.put(message):
+            self.stats.forwarded += 1
+        else:
+            self.stats.dropped += 1
+
+    async def receive(self, event_manager: EventManager) -> None:
+        """Carries out what the worker sends back, until the worker exits."""
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        sentinel = self._process.sentinel
+
+        def exited() -> None:
+            loop.remove_reader(sentinel)  # it stays readable from now on
+            readable.set()
+        with _woken_by(self._returns, readable):
+            loop.add_reader(sentinel, exited)
+            try:
+                while self._process.is_alive() or len(self._returns):
+                    messages = self._returns.get_all()
+                    if not messages:
+                        await readable.wait()
+                        readable.clear()
+                        continue
+                    for message in messages:
+                        kind, *args = pickle.loads(message)
+                        if kind == "event":
+                            source, action, value, sender, ts, lane = args
+                            self.stats.returned_events += 1
+                            event_manager.fire_event(source, action, value, sender=sender, ts=ts, lane=lane)
+                        elif kind == "artnet":
+                            method, method_args, method_kwargs = args
+                            self.stats.returned_commands += 1
+                            self._send_artnet(event_manager, method, method_args, method_kwargs)
+            finally:
+                loop.remove_reader(sentinel)
+        log.warning("events", "[ScriptWorker] The worker of {} exited with code {}", self.name, self._process.exitcode)
+
+    @staticmethod
+    def _send_artnet(event_manager: EventManager, method: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> None:
+        if method == "send_dmx":
+            # The worker's copy of the node registry is not kept up to date, ours is
+            esp = event_manager.nodes.get_by_universe(args[0])
+            if esp is not None:
+                kwargs["ip_override"] = esp.ip
+        getattr(Services.artnet, method)(*args, **kwargs)
+
+    def close(self) -> None:
+        atexit.unregister(self.close)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._events.close()
+        self._returns.close()
+
+
+class _ArtNetProxy:
+    """Stands in for the ArtNet instance in a worker process: every send_* call is carried out by the main process."""
+
+    def __init__(self, returns: SharedRing) -> None:
+        self._returns: SharedRing = returns
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        if not name.startswith("send_"):
+            raise AttributeError(f"ArtNet.{name} is not available in a script worker")
+
+        def send(*args: Any, **kwargs: Any) -> None:
+            message = pickle.dumps(("artnet", name, args, kwargs), pickle.HIGHEST_PROTOCOL)
+            if not self._returns.put(message):
+                log.warning("events", "[ScriptWorker] The return ring is full, dropped ArtNet.{}", name)
+        return send
+
+
+class WorkerEventManager(EventManager):
+    """The EventManager of a script worker process.
+
+    It dispatches the events forwarded by the main process to the subscribers in this process, and hands the events
+    fired here to the main process, which dispatches them to everyone. It does not receive any ArtNet packets itself;
+    instead every forwarded event is mirrored onto the sensor that fired it (see Sensor.mirror_event), so the state of
+    the sensors, their cells and the Derived values built on them follow the main process.
+    """
+
+    def __init__(self, events: SharedRing, returns: SharedRing) -> None:
+        self._events: SharedRing = events
+        self._returns: SharedRing = returns
+        super().__init__(_ArtNetProxy(returns))
+
+    def instantiate_devices(self, libs: Iterable[ModuleType], **kwargs: Any) -> None:
+        super().instantiate_devices(libs, **kwargs)
+        for sensor in self._sensor_dict.values():
+            sensor.mirrored = True
+
+    def _run_async_loop(self):
+        self._loop_thread_id = threading.get_ident()
+        self.loop.create_task(self._dispatch_loop())
+        self.loop.create_task(self._receive_forwarded_events())
+        self.loop.run_forever()
+
+    async def _receive_forwarded_events(self) -> None:
+        readable = asyncio.Event()
+        with _woken_by(self._events, readable):
+            while True:
+                messages = self._events.get_all()
+                if not messages:
+                    await readable.wait()
+                    readable.clear()
+                    continue
+                for message in messages:
+                    source, action, value, sender, ts = pickle.loads(message)
+                    event = Event(intern_key(source), intern_key(action), value, sender, ts)
+                    # Like a packet in the main process, an event updates the sensor before it is dispatched
+                    sensor = self._sensor_dict.get(event.source)
+                    if sensor is not None:
+                        sensor.mirror_event(event)
+                    # The main process has already dispatched these in order of priority, so one lane keeps that order
+                    self._event_queue.put(event)
+
+    def fire_event(self,
+                   source: EventSourceType,
+                   action: EventActionType,
+                   value: EventValueType, *,
+                   sender: tuple[str, int] | None = None,
+                   ts: float | None = None,
+                   lane: EventLane = EventLane.SCRIPT) -> None:
+        ts = ts if ts is not None else time.time()
+        try:
+            message = pickle.dumps(("event", source, action, value, sender, ts, lane), pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as err:
+            log.warning("events", "[ScriptWorker] Unable to fire {} -> {}: {}", source, action, err)
+            return
+        if not self._returns.put(message):
+            log.warning("events", "[ScriptWorker] The return ring is full, dropped {} -> {}", source, action)
+
+    def fire_template(self,
+                      template: EventTemplate,
+                      value: EventValueType, *,
+                      sender: tuple[str, int] | None = None,
+                      ts: float | None = None,
+                      lane: EventLane = EventLane.SCRIPT) -> None:
+        self.fire_event(template.source, template.action, value, sender=sender, ts=ts, lane=lane)
+
+
+class _Unavailable:
+    """Stands in for a service of the main process that a script worker does not have, like api.dmx, so that a
+    script using it fails to load with a clear error rather than with an AttributeError of None."""
+
+    def __init__(self, name: str) -> None:
+        self._name: str = name
+
+    def __getattr__(self, name: str) -> Any:
+        raise AttributeError(f"{self._name}.{name} is not available in a script worker")
+
+
+@contextlib.contextmanager
+def _woken_by(ring: SharedRing, readable: asyncio.Event):
+    """Sets readable whenever the producer of the ring wakes up the running loop."""
+    loop = asyncio.get_running_loop()
+
+    def wake() -> None:
+        ring.clear_wakeup()
+        readable.set()
+    loop.add_reader(ring.fileno(), wake)
+    try:
+        yield
+    finally:
+        loop.remove_reader(ring.fileno())
+
+
+def run_worker(script_name: str,
+               events_name: str,
+               returns_name: str,
+               capacity: int,
+               events_wakeup: Wakeup,
+               returns_wakeup: Wakeup) -> None:
+    """The entry point of a worker process."""
+    from controlpanel import api
+    from .load_scripts import load_scripts
+
+    events = SharedRing(events_name, capacity, events_wakeup)
+    returns = SharedRing(returns_name, capacity, returns_wakeup)
+    event_manager = WorkerEventManager(events, returns)
+    Services.artnet = event_manager._artnet
+    Services.event_manager = event_manager
+    Services.dmx = _Unavailable("api.dmx")
+    Services.game_manager = _Unavailable("api.game_manager")
+    event_manager.instantiate_devices([api.dummy])
+    load_scripts([script_name])
+
+    parent = multiprocessing.parent_process()
+    while parent is None or parent.is_alive():
+        time.sleep(1)
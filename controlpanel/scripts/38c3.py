@@ -10,6 +10,7 @@ from fourteensegment import Display, rgb_to_b16
 
 UNIVERSE = 14
 DISPLAY_COUNT = 3
+COLOR_BUTTONS = ("ButtonRed", "ButtonGreen", "ButtonBlue", "ButtonPower")
 
 PLUG_COLORS = (
     "orange",
@@ -31,6 +32,11 @@ ANTENNA_COLORS = (
 )
 
 
+def antenna_sender_color(buttons: tuple[bool, ...]) -> tuple[int, int, int]:
+    red, green, blue, power = buttons
+    return (255 if red else 0, 255 if green else 0, 255 if blue else 0) if power else (0, 0, 0)
+
+
 class CCCGame(WindowManager):
     BATTERY_DRAIN: float = 0.003  # drain per second
     BATTERY_CHARGE_SPEED: float = 0.1  # charge per second
@@ -52,6 +58,12 @@ class CCCGame(WindowManager):
         self.entered_numbers: list[int] = []
         self.start_time = datetime.now()
 
+        self.antenna_events = api.emitter("38c3.update_antenna")  # update_antenna runs every frame
+        # Only recomputed when one of the buttons changes, instead of polling them every frame
+        self.color_buttons: api.Derived[tuple[bool, ...]] = api.derived(
+            lambda *pressed: pressed, *(api.cell(button, "pressed") for button in COLOR_BUTTONS))
+        self.sender_color: api.Derived[tuple[int, int, int]] = api.derived(antenna_sender_color, self.color_buttons)
+
         self.display = Display(DISPLAY_COUNT)
         self.display.clear()
 
@@ -163,12 +175,7 @@ class CCCGame(WindowManager):
             laser.focus = (axes[3] + 1) / 2
             hat = joystick.get_hat(0)
 
-        self.calculate_color_of_moving_head(
-            api.get_device("ButtonRed").get_pressed(),
-            api.get_device("ButtonGreen").get_pressed(),
-            api.get_device("ButtonBlue").get_pressed(),
-            api.get_device("ButtonPower").get_pressed(),
-        )
+        self.calculate_color_of_moving_head(*self.color_buttons.value)
 
     def check_moving_head_alignment(self):
         if not api.dmx:
@@ -249,14 +256,11 @@ class CCCGame(WindowManager):
             return
         sender_starbar: controlpanel.dmx.devices.VaritecColorsStarbar12 = api.dmx.devices.get("StarBar1")
         receiver_starbar: controlpanel.dmx.devices.VaritecColorsStarbar12 = api.dmx.devices.get("StarBar2")
-        r = 255 if api.get_device("ButtonRed").get_pressed() else 0
-        g = 255 if api.get_device("ButtonGreen").get_pressed() else 0
-        b = 255 if api.get_device("ButtonBlue").get_pressed() else 0
-        sender_color = (r, g, b) if api.get_device("ButtonPower").get_pressed() else (0, 0, 0)
+        sender_color = self.sender_color.value
         sender_starbar.set_leds_to_color(sender_color)
         if sender_color == self.antenna_receiver_color:
             self.antennas_aligned += 1
-            api.fire_event(action="AntennaAligned", value=self.antennas_aligned)
+            self.antenna_events.fire("AntennaAligned", self.antennas_aligned)
             while self.antenna_receiver_color == sender_color:
                 self.antenna_receiver_color = random.choice(ANTENNA_COLORS)
             receiver_starbar.set_leds_to_color(self.antenna_receiver_color)
@@ -491,7 +495,7 @@ def bvg_panel_glitch():
     bvgpanel._send_dmx_data(payload)
 
 
-@api.call_with_frequency(5)
+@api.call_with_frequency(5)  # sleeps while strobing, so it must not run on the event loop
 def uv_random_strobe():
     uv = api.get_device("UVStrobe")
     if random.randint(0, 5) == 0:
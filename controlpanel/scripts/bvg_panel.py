@@ -22,5 +22,4 @@ def callback_bvgpanel_address(event: Event):
     print("Address is ", event.value)
 
 
-for i in range(47):
-    ControlAPI.subscribe(callback_bvgpanel_button, f"TestBVGPanel{i}", "PushButton", True)
+ControlAPI.subscribe(callback_bvgpanel_button, "TestBVGPanel[0-9]*", "PushButton", True)
@@ -1,6 +1,5 @@
-import time
 import datetime
-from controlpanel.scripts import ControlAPI, Event
+from controlpanel import api
 
 from fourteensegment import Display, rgb_to_b16
 
@@ -8,8 +7,8 @@ UNIVERSE = 14
 DISPLAY_COUNT = 3
 
 
-@ControlAPI.callback(action="StartCountdown")
-def start_countdown(event: Event):
+@api.callback(action="StartCountdown")
+async def start_countdown(event: api.Event):
     target = datetime.datetime.now() + datetime.timedelta(seconds=event.value)
 
     # today = datetime.datetime.now()
@@ -38,12 +37,9 @@ def start_countdown(event: Event):
         else:
             string = " 00:00 "
             color = rgb_to_b16(255, 0, 0)
-            ControlAPI.fire_event("countdown.py", "TimeRanOut")
+            api.fire_event("countdown.py", "TimeRanOut")
             run = False
         # print(string)
         display.send_dmx(UNIVERSE, 0, display.text_to_data(string, color))
-        time.sleep(0.055)
+        await api.sleep(0.055)  # a coroutine, so the countdown does not hold on to a thread for ten minutes
 
-
-if __name__ == "__main__":
-    start_countdown()
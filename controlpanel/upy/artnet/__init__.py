@@ -1,5 +1,9 @@
 from .artnet import ArtNet, OpCode
-from micropython import const
+try:
+    from micropython import const
+except ImportError:  # CPython imports the parsers in this package for the desktop's asyncio transport
+    def const(x):
+        return x
 
 KEY = const(76)
 
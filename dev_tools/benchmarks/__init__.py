@@ -0,0 +1,13 @@
+import time
+from typing import Callable
+
+
+def measure(func: Callable[[], object], *, iterations: int, repeat: int = 5) -> float:
+    """Returns the best observed cost of a single call to func in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
@@ -0,0 +1,107 @@
+import asyncio
+import socket
+import struct
+import threading
+import time
+from typing import Any, Callable
+from controlpanel.api.transport import ArtNetProtocol, create_artnet_socket
+from controlpanel.upy.artnet.helper import ARTNET_REPLY_PARSER, OpCode, pack_trigger, parse_header
+
+
+FLOOD_PACKETS = 20_000
+PACED_PACKETS = 2_000
+PACED_INTERVAL = 0.0005
+RECEIVE_TIMEOUT = 1.0
+
+
+class _Collector:
+    """Records on the event loop when each packet arrived and how long it took since it was sent."""
+
+    def __init__(self, expected: int) -> None:
+        self.latencies: list[float] = []
+        self.start: float = time.perf_counter()
+        self.last_arrival: float | None = None
+        self.expected: int = expected
+        self.done: asyncio.Event = asyncio.Event()
+
+    def __call__(self, op_code: OpCode, ip: str, port: int, reply: dict[str, Any]) -> None:
+        now = time.perf_counter()
+        self.last_arrival = now
+        self.latencies.append(now - struct.unpack("<d", reply["Data"])[0])
+        if len(self.latencies) >= self.expected:
+            self.done.set()
+
+
+def _listen_thread(sock: socket.socket, loop: asyncio.AbstractEventLoop, callback: Callable[..., None],
+                   stop: threading.Event) -> None:
+    """What ArtNet.listen does: receive and parse on a thread, then hop onto the event loop."""
+    sock.settimeout(0.1)
+    while not stop.is_set():
+        try:
+            data, addr = sock.recvfrom(1024)
+        except socket.timeout:
+            continue
+        op_code = parse_header(data)
+        parser = ARTNET_REPLY_PARSER.get(op_code) if op_code is not None else None
+        reply = parser(data) if parser is not None else None
+        if reply is not None:
+            loop.call_soon_threadsafe(callback, op_code, *addr, reply)
+
+
+def _send(port: int, count: int, interval: float) -> None:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for seq in range(count):
+        sock.sendto(pack_trigger(76, seq & 0xFF, struct.pack("<d", time.perf_counter())), ("127.0.0.1", port))
+        if interval:
+            time.sleep(interval)
+    sock.close()
+
+
+async def _measure(threaded: bool, count: int, interval: float) -> _Collector:
+    loop = asyncio.get_running_loop()
+    collector = _Collector(count)
+    sock = create_artnet_socket(0)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    port = sock.getsockname()[1]
+    stop = threading.Event()
+    transport = None
+    if threaded:
+        threading.Thread(target=_listen_thread, args=(sock, loop, collector, stop), daemon=True).start()
+    else:
+        transport, _ = await loop.create_datagram_endpoint(lambda: ArtNetProtocol(collector), sock=sock)
+    sender = threading.Thread(target=_send, args=(port, count, interval))
+    collector.start = time.perf_counter()
+    sender.start()
+    while not collector.done.is_set():
+        received = len(collector.latencies)
+        await asyncio.sleep(RECEIVE_TIMEOUT)
+        if len(collector.latencies) == received and not sender.is_alive():
+            break  # the remaining packets have been dropped
+    sender.join()
+    stop.set()
+    if transport is not None:
+        transport.close()
+    else:
+        await asyncio.sleep(0.2)  # let the listen thread notice the stop event
+        sock.close()
+    return collector
+
+
+def _percentile(samples: list[float], percentile: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))] if samples else float("nan")
+
+
+def benchmark_artnet_transport() -> None:
+    print(f"{'transport':>10} {'received':>9} {'packets/s':>10} {'p50 [us]':>9} {'p99 [us]':>9}")
+    for threaded in (True, False):
+        name = "thread" if threaded else "asyncio"
+        flood = asyncio.run(_measure(threaded, FLOOD_PACKETS, 0.0))
+        throughput = len(flood.latencies) / (flood.last_arrival - flood.start) if flood.latencies else 0.0
+        paced = asyncio.run(_measure(threaded, PACED_PACKETS, PACED_INTERVAL))
+        print(f"{name:>10} {len(flood.latencies):>9} {throughput:>10.0f} "
+              f"{1e6 * _percentile(paced.latencies, 50):>9.1f} {1e6 * _percentile(paced.latencies, 99):>9.1f}")
+
+
+if __name__ == "__main__":
+    benchmark_artnet_transport()
@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import resource
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from controlpanel.api.commons import Event, intern_key
+from controlpanel.api.tracing import EventTrace
+
+
+EVENT_RATE = 10_000  # events per second
+DURATION = 3.0  # seconds of sustained load
+RETAINED = 20_000  # events kept alive at a time, like a backed up queue
+SOURCES = tuple(f"Device{i}".encode() for i in range(32))
+ACTIONS = tuple(action.encode() for action in ("ButtonPressed", "ButtonReleased", "WaterFlow", "TagScanned"))
+
+
+@dataclass(frozen=True)
+class _LegacyEvent:
+    """Event as it was before it had slots"""
+    source: str
+    action: str
+    value: Any
+    sender: tuple[str, int] | None
+    timestamp: float
+    trace: Optional[EventTrace] = field(default=None, compare=False, repr=False)
+
+
+def _make_event(compact: bool, i: int) -> Any:
+    # Sources and actions are decoded like those that come back from a script worker, so every event gets new strings
+    source = SOURCES[i % len(SOURCES)].decode()
+    action = ACTIONS[i % len(ACTIONS)].decode()
+    if compact:
+        return Event(intern_key(source), intern_key(action), i & 1 == 0, ("10.0.0.2", 6454), time.time())
+    return _LegacyEvent(source, action, i & 1 == 0, ("10.0.0.2", 6454), time.time())
+
+
+def _rss() -> int:
+    """The current resident set size in bytes, or the peak where the current one is not available."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _allocation_per_event(compact: bool, count: int = RETAINED) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    events = [_make_event(compact, i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    list_size = events.__sizeof__()
+    return (after - before - list_size) / count
+
+
+def _sustained_load(compact: bool) -> tuple[float, float, int]:
+    """Fires EVENT_RATE events per second for DURATION seconds, keeping the latest RETAINED events alive.
+    Returns the allocation per event in bytes, the achieved event rate and the growth of the RSS in bytes."""
+    retained: deque[Any] = deque(maxlen=RETAINED)
+    rss_before = _rss()
+    batch = EVENT_RATE // 1000
+    start = time.perf_counter()
+    fired = 0
+    while (now := time.perf_counter()) - start < DURATION:
+        target = int((now - start) * EVENT_RATE)
+        while fired < target:
+            retained.append(_make_event(compact, fired))
+            fired += 1
+        time.sleep(batch / EVENT_RATE)
+    rate = fired / (time.perf_counter() - start)
+    rss_growth = _rss() - rss_before
+    retained.clear()
+    return _allocation_per_event(compact), rate, rss_growth
+
+
+def benchmark_event_allocation() -> None:
+    # Each variant runs in a fresh process, so that neither inherits the other's heap
+    context = multiprocessing.get_context("spawn")
+    print(f"{'event':>8} {'bytes/event':>12} {'events/s':>10} {'RSS growth [MiB]':>17}")
+    for compact, label in ((False, "legacy"), (True, "slotted")):
+        with context.Pool(1) as pool:
+            per_event, rate, rss_growth = pool.apply(_sustained_load, (compact,))
+        print(f"{label:>8} {per_event:>12.0f} {rate:>10.0f} {rss_growth / 2 ** 20:>17.1f}")
+
+
+if __name__ == "__main__":
+    benchmark_event_allocation()
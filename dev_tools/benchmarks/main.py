@@ -0,0 +1,16 @@
+from .subscription_index import benchmark_subscription_index, benchmark_subscription_churn
+from .artnet_transport import benchmark_artnet_transport
+from .trigger_parsing import benchmark_trigger_parsing
+from .event_allocation import benchmark_event_allocation
+
+
+def run_all_benchmarks() -> None:
+    benchmark_subscription_index()
+    benchmark_subscription_churn()
+    benchmark_artnet_transport()
+    benchmark_trigger_parsing()
+    benchmark_event_allocation()
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
@@ -0,0 +1,88 @@
+import random
+from collections import defaultdict
+from controlpanel.api.commons import Condition, Subscriber, ConcurrencyPolicy
+from controlpanel.api.subscriptions import SubscriptionIndex
+from . import measure
+
+
+SUBSCRIBER_COUNTS = (10, 1_000, 10_000)
+ACTIONS = ("ButtonPressed", "ButtonReleased", "ButtonsChanged", "DigitEntered", "PlugConnected")
+WILDCARD_RATIO = 0.05  # share of subscribers that leave source or action unspecified, like 38c3.py does
+
+
+def _noop() -> None:
+    pass
+
+
+def _legacy_resolve(register: dict[Condition, list[Subscriber]], source, action, value) -> list[Subscriber]:
+    """The 8-way Condition probing that EventManager used before the SubscriptionIndex"""
+    subscribers: list[Subscriber] = []
+    for s, a, v in ((source, action, value), (source, action, None), (source, None, value), (source, None, None),
+                    (None, action, value), (None, action, None), (None, None, value), (None, None, None)):
+        subscribers += register.get(Condition(s, a, v), [])
+    return subscribers
+
+
+def _make_conditions(count: int, rng: random.Random) -> list[Condition]:
+    source_count = max(1, count // len(ACTIONS))
+    conditions: list[Condition] = []
+    for i in range(count):
+        source = f"Device{i % source_count}"
+        action = ACTIONS[i % len(ACTIONS)]
+        if rng.random() < WILDCARD_RATIO:
+            if rng.random() < 0.5:
+                source = None
+            else:
+                action = None
+        conditions.append(Condition(source, action, None))
+    return conditions
+
+
+def benchmark_subscription_index(seed: int = 0) -> None:
+    rng = random.Random(seed)
+    print(f"{'subscribers':>12} {'legacy [us]':>12} {'index [us]':>12} {'speedup':>8}")
+    for count in SUBSCRIBER_COUNTS:
+        legacy_register: dict[Condition, list[Subscriber]] = defaultdict(list)
+        index = SubscriptionIndex()
+        for condition in _make_conditions(count, rng):
+            subscriber = Subscriber(_noop, False, ConcurrencyPolicy.SKIP, False, condition=condition)
+            legacy_register[condition].append(subscriber)
+            index.add(condition, subscriber)
+
+        source_count = max(1, count // len(ACTIONS))
+        events = [(f"Device{rng.randrange(source_count)}", rng.choice(ACTIONS), rng.random() < 0.5)
+                  for _ in range(256)]
+        for event in events:
+            assert _legacy_resolve(legacy_register, *event) == list(index.resolve(*event)), "Index diverges from legacy"
+
+        event_iter = iter(events * 1_000)
+        legacy_cost = measure(lambda: _legacy_resolve(legacy_register, *next(event_iter)), iterations=20_000)
+        event_iter = iter(events * 1_000)
+        index_cost = measure(lambda: index.resolve(*next(event_iter)), iterations=20_000)
+        print(f"{count:>12} {legacy_cost:>12.2f} {index_cost:>12.2f} {legacy_cost / index_cost:>7.1f}x")
+
+
+def benchmark_subscription_churn(seed: int = 0) -> None:
+    """Subscribes and unsubscribes per-round subscriptions (like a game round would) next to a fixed set of them"""
+    rng = random.Random(seed)
+    print(f"{'subscribers':>12} {'subscribe [us]':>15} {'unsubscribe [us]':>17} {'resolve [us]':>13}")
+    for count in SUBSCRIBER_COUNTS:
+        index = SubscriptionIndex()
+        for condition in _make_conditions(count, rng):
+            index.add(condition, Subscriber(_noop, False, ConcurrencyPolicy.SKIP, False, condition=condition))
+        round_conditions = [Condition(f"Device{i % 8}", ACTIONS[i % len(ACTIONS)], i) for i in range(count)]
+        round_subscribers = [Subscriber(_noop, False, ConcurrencyPolicy.SKIP, False, condition=condition) for condition in round_conditions]
+        subscribe_iter = iter(round_subscribers * 5)
+        subscribe_cost = measure(lambda: (subscriber := next(subscribe_iter), index.add(subscriber.condition, subscriber)),
+                                 iterations=count, repeat=1)
+        resolve_cost = measure(lambda: index.resolve("Device0", ACTIONS[0], 0), iterations=1_000)
+        unsubscribe_iter = iter(round_subscribers)
+        unsubscribe_cost = measure(lambda: (subscriber := next(unsubscribe_iter),
+                                            index.remove(subscriber.condition, subscriber)),
+                                   iterations=count, repeat=1)
+        print(f"{count:>12} {subscribe_cost:>15.2f} {unsubscribe_cost:>17.2f} {resolve_cost:>13.2f}")
+
+
+if __name__ == "__main__":
+    benchmark_subscription_index()
+    benchmark_subscription_churn()
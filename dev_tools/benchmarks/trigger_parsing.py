@@ -0,0 +1,58 @@
+from controlpanel.api.commons import KEY_CONTROL_PANEL_PROTOCOL
+from controlpanel.api.dummy import Sensor
+from controlpanel.api.event_manager import EventManager
+from controlpanel.api.tracing import Tracer
+from controlpanel.upy.artnet.helper import ARTNET_REPLY_PARSER, pack_trigger, parse_header
+from . import measure
+
+
+SENSOR_COUNT = 64
+ITERATIONS = 100_000
+
+
+class _NullSensor(Sensor):
+    """Consumes the payload without firing any events, so that only the parsing is measured."""
+
+    @property
+    def desynced(self) -> bool:
+        return False
+
+    def parse_trigger_payload(self, payload: bytes, timestamp: float) -> None:
+        payload[0]
+
+
+def _make_event_manager(sensors: list[Sensor]) -> EventManager:
+    """An EventManager with just enough state to parse triggers, without sockets or an event loop."""
+    event_manager = EventManager.__new__(EventManager)
+    event_manager._ip = "127.0.0.1"
+    event_manager._accept_own_broadcast = False
+    event_manager.tracer = Tracer()
+    event_manager._sensor_dict = {sensor.name: sensor for sensor in sensors}
+    event_manager._sensor_index = {sensor.name.encode("ascii"): sensor for sensor in sensors}
+    return event_manager
+
+
+def benchmark_trigger_parsing() -> None:
+    sensors: list[Sensor] = [_NullSensor(None, f"Sensor{i}") for i in range(SENSOR_COUNT)]
+    event_manager = _make_event_manager(sensors)
+    packets = [pack_trigger(KEY_CONTROL_PANEL_PROTOCOL, 0, sensor.name.encode("ascii") + b"\x00" + b"\x01\x02\x03\x04")
+               for sensor in sensors]
+
+    def regular_path(data: bytes) -> None:
+        # What ArtNet.listen and EventManager._receive do for every packet
+        op_code = parse_header(data)
+        reply = ARTNET_REPLY_PARSER[op_code](data)
+        event_manager._receive(op_code, "10.0.0.2", 6454, reply)
+
+    packet_iter = iter(packets * (6 * ITERATIONS // SENSOR_COUNT))
+    regular_cost = measure(lambda: regular_path(next(packet_iter)), iterations=ITERATIONS)
+    packet_iter = iter(packets * (6 * ITERATIONS // SENSOR_COUNT))
+    fast_cost = measure(lambda: event_manager._receive_sensor_trigger(next(packet_iter), "10.0.0.2", 6454),
+                        iterations=ITERATIONS)
+    print(f"{'trigger path':>12} {'cost [us]':>10} {'packets/s per core':>19}")
+    print(f"{'regular':>12} {regular_cost:>10.2f} {1e6 / regular_cost:>19.0f}")
+    print(f"{'fast':>12} {fast_cost:>10.2f} {1e6 / fast_cost:>19.0f}")
+
+
+if __name__ == "__main__":
+    benchmark_trigger_parsing()
@@ -119,9 +119,12 @@ def generate_overloads(devices: Dict[str, Dict[str, str]]) -> str:
         lines.append("    *,")
         lines.append(f"    source: {devices_literal} | None = None,")
         lines.append(f"    action: {action_type_str} | None = None,")
-        lines.append(f"    value: {value_type_str} | None = None,")
+        lines.append(f"    value: {value_type_str} | ValuePredicate | None = None,")
         lines.append("    fire_once: bool = False,")
         lines.append("    allow_parallelism: bool = False,")
+        lines.append("    queue_policy: QueuePolicy | None = None,")
+        lines.append("    concurrency: ConcurrencyPolicy | None = None,")
+        lines.append("    max_pending: int = 16,")
         lines.append(
             f") -> Callable[[Callable[[Event[{base_value_type}]], None]], Callable[[Event[{base_value_type}]], None]]: ...")
         lines.append("")
@@ -131,7 +134,7 @@ def generate_overloads(devices: Dict[str, Dict[str, str]]) -> str:
 def generate_callback_stub_file():
     header = '''"""This file has been auto-generated by the generate_stubs script"""
 from typing import Callable, List, Literal, Hashable, overload
-from controlpanel.api import Event
+from controlpanel.api import Event, QueuePolicy, ConcurrencyPolicy, ValuePredicate
 
 '''
 
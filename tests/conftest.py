@@ -0,0 +1,28 @@
+import pytest
+from controlpanel.api.event_manager import EventManager
+from controlpanel.api.services import Services
+
+
+class FakeArtNet:
+    """Stands in for the ArtNet instance: receives nothing and sends nothing."""
+
+    def subscribe_all(self, callback) -> None:
+        pass
+
+    def listen(self, timeout: float | None = None) -> None:
+        pass
+
+    def __getattr__(self, name: str):
+        if name.startswith("send_"):
+            return lambda *args, **kwargs: None
+        raise AttributeError(name)
+
+
+@pytest.fixture
+def event_manager(tmp_path, monkeypatch) -> EventManager:
+    """An event manager whose loop runs on a thread of its own, registered as the one scripts and devices use."""
+    monkeypatch.setattr(EventManager, "NODE_REGISTRY_PATH", str(tmp_path / "nodes.json"))
+    event_manager = EventManager(FakeArtNet(), threaded_receive=True)
+    monkeypatch.setattr(Services, "event_manager", event_manager)
+    monkeypatch.setattr(Services, "artnet", event_manager._artnet)
+    return event_manager
@@ -0,0 +1,32 @@
+import asyncio
+import queue
+from controlpanel.api.commons import Event
+from controlpanel.api.dummy.button import Button
+
+
+def test_pressing_a_button_fires_an_event(event_manager):
+    received: queue.Queue[Event] = queue.Queue()
+
+    def on_pressed(event: Event) -> None:
+        received.put(event)
+    event_manager.subscribe(on_pressed, "TestButton", "ButtonPressed", None)
+    button = Button(event_manager._artnet, "TestButton")
+
+    button.press()
+
+    event = received.get(timeout=1.0)
+    assert (event.source, event.action, event.value) == ("TestButton", "ButtonPressed", True)
+    assert button.pressed
+
+
+def test_waiting_for_a_button_press(event_manager):
+    button = Button(event_manager._artnet, "TestButton")
+
+    async def press_and_wait() -> Event:
+        waiting = asyncio.ensure_future(button.wait_for("ButtonPressed", timeout=1.0))
+        await asyncio.sleep(0.05)  # the waiter is registered on the event manager's loop
+        button.press()
+        return await waiting
+
+    event = asyncio.run(press_and_wait())
+    assert (event.source, event.action, event.value) == ("TestButton", "ButtonPressed", True)
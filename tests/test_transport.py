@@ -0,0 +1,26 @@
+from controlpanel.api.transport import ArtNetProtocol
+from controlpanel.upy.artnet.helper import ARTNET_REPLY_PARSER, ART_NET_HEADER, OpCode
+
+ADDRESS = ("10.0.0.2", 6454)
+
+
+def _packet(op_code: OpCode, body: bytes) -> bytes:
+    return ART_NET_HEADER + op_code.to_bytes(2, "little") + body
+
+
+def test_truncated_command_is_dropped():
+    received = []
+    protocol = ArtNetProtocol(lambda *reply: received.append(reply))
+
+    # 14 and 15 bytes: long enough to be parsed, too short for the length field
+    protocol.datagram_received(_packet(OpCode.ArtCommand, b"\x00\x0e\x00\x00"), ADDRESS)
+    protocol.datagram_received(_packet(OpCode.ArtCommand, b"\x00\x0e\x00\x00\x05"), ADDRESS)
+
+    assert received == []
+
+
+def test_packets_of_any_length_do_not_raise():
+    protocol = ArtNetProtocol(lambda *reply: None)
+    for op_code in ARTNET_REPLY_PARSER:
+        for length in range(300):
+            protocol.datagram_received(_packet(op_code, b"\xff" * length), ADDRESS)